@@ -250,7 +250,17 @@ class ApiClient {
   }
 
   async listLicenseKeys(): Promise<ListLicensesResponse> {
-    return this.fetch<ListLicensesResponse>('/license/list');
+    // The endpoint is paginated; follow nextOffset so every key is returned
+    const licenses: ListLicensesResponse['licenses'] = [];
+    let offset: number | null | undefined = 0;
+    while (offset != null) {
+      const page: ListLicensesResponse = await this.fetch<ListLicensesResponse>(
+        `/license/list?limit=200&offset=${offset}`
+      );
+      licenses.push(...page.licenses);
+      offset = page.nextOffset;
+    }
+    return { licenses, nextOffset: null };
   }
 
   async revokeLicenseKey(key: string): Promise<RevokeLicenseResponse> {
@@ -0,0 +1,5 @@
+-- DropIndex
+DROP INDEX "license_keys_user_id_idx";
+
+-- CreateIndex
+CREATE INDEX "license_keys_user_id_created_at_idx" ON "license_keys"("user_id", "created_at" DESC);
@@ -0,0 +1,3 @@
+-- DropIndex
+-- Covered by the leading column of "dedupe_groups_upload_id_group_index_key"
+DROP INDEX "dedupe_groups_upload_id_idx";
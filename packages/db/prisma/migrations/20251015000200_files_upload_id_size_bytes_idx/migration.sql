@@ -0,0 +1,7 @@
+-- DropIndex
+DROP INDEX "files_upload_id_idx";
+
+-- CreateIndex
+-- Leading upload_id still serves per-upload lookups; size_bytes lets quota
+-- sums over a user's uploads run as index-only scans
+CREATE INDEX "files_upload_id_size_bytes_idx" ON "files"("upload_id", "size_bytes");
@@ -30,6 +30,8 @@ export const ListLicensesResponseSchema = z.object({
       revoked: z.boolean(),
     })
   ),
+  // Offset of the next page; null on the last page
+  nextOffset: z.number().int().nullable().optional(),
 });
 
 export type ListLicensesResponse = z.infer<typeof ListLicensesResponseSchema>;
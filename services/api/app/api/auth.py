@@ -1,7 +1,8 @@
 """Authentication endpoints"""
 import logging
+import re
 from fastapi import APIRouter, HTTPException, Response, Cookie, Depends
-from pydantic import BaseModel, EmailStr, validator
+from pydantic import BaseModel, EmailStr, field_validator
 from typing import Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -14,13 +15,17 @@ from app.models.user import User
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Characters stripped from display names to prevent XSS
+UNSAFE_NAME_CHARS = re.compile(r'[<>\"\'&]')
+
 
 class RegisterRequest(BaseModel):
     email: EmailStr
     password: str
     name: Optional[str] = None
     
-    @validator('password')
+    @field_validator('password')
+    @classmethod
     def validate_password(cls, v):
         """Validate password strength"""
         if len(v) < 8:
@@ -33,13 +38,13 @@ class RegisterRequest(BaseModel):
             raise ValueError('Password must contain at least one digit')
         return v
     
-    @validator('name')
+    @field_validator('name')
+    @classmethod
     def validate_name(cls, v):
         """Sanitize name input"""
         if v:
             # Remove potential XSS characters
-            import re
-            v = re.sub(r'[<>\"\'&]', '', v)
+            v = UNSAFE_NAME_CHARS.sub('', v)
             if len(v) > 100:
                 raise ValueError('Name must be less than 100 characters')
         return v
@@ -92,7 +97,7 @@ async def register(request: RegisterRequest, session: AsyncSession = Depends(get
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Registration failed: {e}", exc_info=True)
+        logger.exception("Registration failed: %s", e)
         raise HTTPException(status_code=500, detail="Registration failed")
 
 
@@ -144,7 +149,7 @@ async def login(request: LoginRequest, response: Response, session: AsyncSession
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Login failed: {e}", exc_info=True)
+        logger.exception("Login failed: %s", e)
         raise HTTPException(status_code=500, detail="Login failed")
 
 
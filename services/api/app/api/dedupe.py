@@ -2,6 +2,8 @@
 import os
 import asyncio
 import logging
+from collections import defaultdict
+from pathlib import Path
 from typing import List, Dict, Any
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, UploadFile, File
 from fastapi.responses import StreamingResponse
@@ -9,8 +11,13 @@ from pydantic import BaseModel
 from app.core.config import settings
 from app.middleware.auth import get_current_user
 from app.middleware.validation import validate_file_upload
+from app.services.embedding_cache import cosine_similarity, group_similar_embeddings
 from app.services.file_processor import file_processor
-from app.services.ml_client import MLServiceClient
+from app.services.image_processor import (
+    PHASH_BITS, PHASH_HEX_LENGTH, group_similar_hashes, is_informative_hash
+)
+from app.services.ml_client import ml_client
+from app.services.tie_breaker import select_keep_file
 from app.services.zip_service import zip_service
 import aiofiles
 import uuid
@@ -18,9 +25,6 @@ import uuid
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Initialize ML client
-ml_client = MLServiceClient()
-
 
 class DedupePreviewRequest(BaseModel):
     files: List[Dict[str, Any]]
@@ -63,101 +67,100 @@ async def preview_duplicates(
         )
     try:
         upload_id = str(uuid.uuid4())
-        processed_files = []
         all_texts = []
         all_images = []
         
         logger.info(f"Processing {len(request.files)} files for user {user.email}")
-        logger.info(f"Files received: {[f.get('name') for f in request.files]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Files received: %s", [f.get('name') for f in request.files])
         
-        # Process each file
-        for i, file_data in enumerate(request.files):
-            try:
-                # Process files using real file processing
-                file_result = await _process_real_file(file_data, i)
-                processed_files.append(file_result)
-                
-                # Collect text and image data for ML processing
-                if file_result.get('text_content'):
-                    all_texts.append(file_result['text_content'])
-                if file_result.get('base64_image'):
-                    all_images.append(file_result['base64_image'])
-                    
-            except Exception as e:
-                logger.error(f"Failed to process file {i}: {e}")
-                # Add failed file to results
-                processed_files.append({
-                    'id': f"file_{i}",
-                    'name': file_data.get('name', f'file_{i}'),
-                    'size': file_data.get('size', 0),
-                    'type': file_data.get('type', 'application/octet-stream'),
-                    'success': False,
-                    'error': str(e)
-                })
+        # Process files concurrently, bounded so a large request doesn't
+        # read every file into memory at once
+        semaphore = asyncio.Semaphore(settings.PROCESSING_CONCURRENCY)
         
-        # Generate embeddings for text and images with SHA-256 caching
-        text_embeddings = []
-        image_embeddings = []
+        async def process_with_limit(i: int, file_data: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    # Process files using real file processing
+                    return await _process_real_file(file_data, i)
+                except Exception as e:
+                    logger.error(f"Failed to process file {i}: {e}")
+                    # Add failed file to results
+                    return {
+                        'id': f"file_{i}",
+                        'name': file_data.get('name', f'file_{i}'),
+                        'size': file_data.get('size', 0),
+                        'type': file_data.get('type', 'application/octet-stream'),
+                        'success': False,
+                        'error': str(e)
+                    }
         
-        if all_texts:
-            try:
-                # Extract SHA-256 hashes for caching (must align with all_texts)
-                text_hashes = []
-                for file_result in processed_files:
-                    if file_result.get('text_content'):
-                        text_hashes.append(file_result.get('sha256') or file_result.get('file_hash', ''))
-                
-                # Ensure arrays are aligned
-                if len(text_hashes) != len(all_texts):
-                    logger.warning(f"Hash count ({len(text_hashes)}) doesn't match text count ({len(all_texts)}), using empty hashes")
-                    # Pad with empty strings if needed
-                    while len(text_hashes) < len(all_texts):
-                        text_hashes.append('')
-                
-                # Use embedding cache with batch processing
-                from app.services.embedding_cache import embedding_cache
-                text_embeddings, cache_hits = await embedding_cache.get_or_generate_text_embeddings(
-                    all_texts, text_hashes
-                )
-                cache_hit_count = sum(cache_hits)
-                logger.info(f"Generated {len(text_embeddings)} text embeddings ({cache_hit_count} from cache, {len(text_embeddings) - cache_hit_count} new)")
-            except Exception as e:
-                logger.error(f"Text embedding generation failed: {e}")
-                # Fallback to direct generation
+        # gather preserves request order, which the embedding alignment relies on
+        processed_files = await asyncio.gather(
+            *(process_with_limit(i, file_data) for i, file_data in enumerate(request.files))
+        )
+        
+        # Collect text and image data for ML processing, their SHA-256 cache
+        # keys and the success count in a single pass
+        text_hashes = []
+        image_hashes = []
+        successful_files = 0
+        for file_result in processed_files:
+            successful_files += bool(file_result.get('success', False))
+            file_hash = file_result.get('sha256') or file_result.get('file_hash', '')
+            if file_result.get('text_content'):
+                all_texts.append(file_result['text_content'])
+                text_hashes.append(file_hash)
+            if file_result.get('base64_image'):
+                all_images.append(file_result['base64_image'])
+                image_hashes.append(file_hash)
+        
+        # Generate embeddings for text and images with SHA-256 caching
+        async def _generate_text_embeddings() -> List[List[float]]:
+            text_embeddings = []
+            if all_texts:
                 try:
-                    text_embeddings = await ml_client.generate_text_embeddings(all_texts)
-                except:
-                    pass
+                    # Use embedding cache with batch processing
+                    from app.services.embedding_cache import embedding_cache
+                    text_embeddings, cache_hits = await embedding_cache.get_or_generate_text_embeddings(
+                        all_texts, text_hashes
+                    )
+                    cache_hit_count = sum(cache_hits)
+                    logger.info(f"Generated {len(text_embeddings)} text embeddings ({cache_hit_count} from cache, {len(text_embeddings) - cache_hit_count} new)")
+                except Exception as e:
+                    logger.error(f"Text embedding generation failed: {e}")
+                    # Fallback to direct generation
+                    try:
+                        text_embeddings = await ml_client.generate_text_embeddings(all_texts)
+                    except:
+                        pass
+            return text_embeddings
         
-        if all_images:
-            try:
-                # Extract SHA-256 hashes for caching (must align with all_images)
-                image_hashes = []
-                for file_result in processed_files:
-                    if file_result.get('base64_image'):
-                        image_hashes.append(file_result.get('sha256') or file_result.get('file_hash', ''))
-                
-                # Ensure arrays are aligned
-                if len(image_hashes) != len(all_images):
-                    logger.warning(f"Hash count ({len(image_hashes)}) doesn't match image count ({len(all_images)}), using empty hashes")
-                    # Pad with empty strings if needed
-                    while len(image_hashes) < len(all_images):
-                        image_hashes.append('')
-                
-                # Use embedding cache with batch processing
-                from app.services.embedding_cache import embedding_cache
-                image_embeddings, cache_hits = await embedding_cache.get_or_generate_image_embeddings(
-                    all_images, image_hashes
-                )
-                cache_hit_count = sum(cache_hits)
-                logger.info(f"Generated {len(image_embeddings)} image embeddings ({cache_hit_count} from cache, {len(image_embeddings) - cache_hit_count} new)")
-            except Exception as e:
-                logger.error(f"Image embedding generation failed: {e}")
-                # Fallback to direct generation
+        async def _generate_image_embeddings() -> List[List[float]]:
+            image_embeddings = []
+            if all_images:
                 try:
-                    image_embeddings = await ml_client.generate_image_embeddings(all_images)
-                except:
-                    pass
+                    # Use embedding cache with batch processing
+                    from app.services.embedding_cache import embedding_cache
+                    image_embeddings, cache_hits = await embedding_cache.get_or_generate_image_embeddings(
+                        all_images, image_hashes
+                    )
+                    cache_hit_count = sum(cache_hits)
+                    logger.info(f"Generated {len(image_embeddings)} image embeddings ({cache_hit_count} from cache, {len(image_embeddings) - cache_hit_count} new)")
+                except Exception as e:
+                    logger.error(f"Image embedding generation failed: {e}")
+                    # Fallback to direct generation
+                    try:
+                        image_embeddings = await ml_client.generate_image_embeddings(all_images)
+                    except:
+                        pass
+            return image_embeddings
+        
+        # Text and image embeddings are independent, so request them concurrently
+        text_embeddings, image_embeddings = await asyncio.gather(
+            _generate_text_embeddings(),
+            _generate_image_embeddings(),
+        )
         
         # Find duplicate groups using similarity
         groups = await _find_duplicate_groups(processed_files, text_embeddings, image_embeddings)
@@ -165,9 +168,9 @@ async def preview_duplicates(
         # Calculate processing statistics
         processing_stats = {
             'total_files': len(processed_files),
-            'successful_files': len([f for f in processed_files if f.get('success', False)]),
-            'text_files': len([f for f in processed_files if f.get('text_content')]),
-            'image_files': len([f for f in processed_files if f.get('base64_image')]),
+            'successful_files': successful_files,
+            'text_files': len(all_texts),
+            'image_files': len(all_images),
             'duplicate_groups': len(groups),
             'total_duplicates': sum(len(g.get('duplicates', [])) for g in groups),
             'text_embeddings_generated': len(text_embeddings),
@@ -184,7 +187,7 @@ async def preview_duplicates(
         )
         
     except Exception as e:
-        logger.error(f"Deduplication preview failed: {e}", exc_info=True)
+        logger.exception("Deduplication preview failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
 
@@ -205,7 +208,7 @@ async def _process_real_file(file_data: Dict[str, Any], index: int) -> Dict[str,
         
         if not file_content:
             # Use the actual file path provided by the user (with security validation)
-            logger.info(f"Processing file: {filename}, path: {file_path}")
+            logger.debug("Processing file: %s, path: %s", filename, file_path)
             if file_path:
                 # Validate file path for security
                 from app.utils.file_security import validate_file_path, sanitize_filename
@@ -218,25 +221,23 @@ async def _process_real_file(file_data: Dict[str, Any], index: int) -> Dict[str,
                     logger.error(f"Invalid or unsafe file path: {file_path}")
                     raise ValueError(f"Invalid or unsafe file path")
                 
-                if os.path.exists(file_path):
-                    try:
-                        with open(file_path, 'rb') as f:
-                            file_content = f.read()
-                        logger.info(f"Successfully read file from user path: {file_path} ({len(file_content)} bytes)")
-                    except Exception as e:
-                        logger.error(f"Failed to read file from user path {file_path}: {e}")
-                        raise FileNotFoundError(f"Failed to read file from path {file_path}: {e}")
-                else:
+                # Read directly; a missing file surfaces as FileNotFoundError
+                try:
+                    file_content = await asyncio.to_thread(Path(file_path).read_bytes)
+                    logger.debug("Successfully read file from user path: %s (%d bytes)", file_path, len(file_content))
+                except FileNotFoundError:
                     logger.error(f"File does not exist: {file_path}")
                     raise FileNotFoundError(f"File not found: {file_path}")
+                except Exception as e:
+                    logger.error(f"Failed to read file from user path {file_path}: {e}")
+                    raise FileNotFoundError(f"Failed to read file from path {file_path}: {e}")
             else:
                 # Fallback to test_files directory for testing
                 test_file_path = f"test_files/{filename}"
-                if os.path.exists(test_file_path):
-                    with open(test_file_path, 'rb') as f:
-                        file_content = f.read()
-                    logger.info(f"Successfully read file from test_files: {test_file_path}")
-                else:
+                try:
+                    file_content = await asyncio.to_thread(Path(test_file_path).read_bytes)
+                    logger.debug("Successfully read file from test_files: %s", test_file_path)
+                except FileNotFoundError:
                     # File not found - return error instead of mock data
                     logger.error(f"File not found: {filename} at path {file_path} or test_files")
                     raise FileNotFoundError(f"File not found: {filename}")
@@ -292,30 +293,41 @@ async def _find_duplicate_groups(
     Find duplicate groups using hash matching and similarity analysis
     """
     groups = []
-    processed_files = [f for f in files if f.get('success', False)]
-    logger.info(f"Processing {len(processed_files)} successful files for duplicate detection")
     
-    # Group files by SHA-256 hash (exact duplicates)
-    hash_groups = {}
-    for file in processed_files:
+    # Group successful files by SHA-256 hash (exact duplicates) and by exact
+    # text content in a single pass
+    hash_groups = defaultdict(list)
+    text_content_groups = defaultdict(list)
+    successful_count = 0
+    for file in files:
+        if not file.get('success', False):
+            continue
+        successful_count += 1
+        
         # Try both 'sha256' and 'file_hash' fields for compatibility
         file_hash = file.get('sha256') or file.get('file_hash', '')
-        logger.info(f"File {file.get('name')} has hash: {file_hash[:16] if file_hash else 'N/A'}...")
         if file_hash:
-            if file_hash not in hash_groups:
-                hash_groups[file_hash] = []
             hash_groups[file_hash].append(file)
+        
+        text_content = file.get('text_content')
+        if text_content:
+            text_content_groups[text_content].append(file)
     
-    logger.info(f"Found {len(hash_groups)} unique hashes")
-    logger.info(f"Hash groups: {list(hash_groups.keys())}")
+    logger.debug(
+        "Found %d unique hashes among %d successful files",
+        len(hash_groups), successful_count
+    )
     
     # Create groups for files with same hash
     group_index = 0
+    distinct_files = []  # One file per distinct content, for near-duplicate matching
     for file_hash, hash_group in hash_groups.items():
-        if len(hash_group) > 1:
+        if len(hash_group) == 1:
+            distinct_files.append(hash_group[0])
+        else:
             # Use tie-breaker logic to select keep file
-            from app.services.tie_breaker import select_keep_file
             kept_file = select_keep_file(hash_group)
+            distinct_files.append(kept_file)
             
             duplicates = []
             for duplicate_file in hash_group:
@@ -338,45 +350,130 @@ async def _find_duplicate_groups(
             })
             group_index += 1
     
-    # Group files by text content similarity (for files with same text content)
-    text_files = [f for f in processed_files if f.get('text_content') and f.get('success', False)]
-    if len(text_files) > 1:
-        # Group by exact text content
-        text_content_groups = {}
-        for file in text_files:
-            text_content = file.get('text_content', '')
-            if text_content:
-                if text_content not in text_content_groups:
-                    text_content_groups[text_content] = []
-                text_content_groups[text_content].append(file)
+    # Create groups for files with same text content
+    text_representatives = []  # The kept file for each distinct text
+    for text_content, text_group in text_content_groups.items():
+        if len(text_group) == 1:
+            text_representatives.append(text_group[0])
+        else:
+            # Use tie-breaker logic to select keep file
+            kept_file = select_keep_file(text_group)
+            text_representatives.append(kept_file)
+            
+            duplicates = []
+            for duplicate_file in text_group:
+                if duplicate_file.get('id') != kept_file.get('id') and \
+                   duplicate_file.get('fileName') != kept_file.get('fileName'):
+                    duplicates.append({
+                        'file': duplicate_file,
+                        'similarity': 1.0,  # Exact text match
+                        'reason': 'Exact text content match',
+                        'isKept': False
+                    })
+            
+            groups.append({
+                'id': f'group_{group_index}',
+                'groupIndex': group_index,
+                'keepFile': kept_file,
+                'duplicates': duplicates,
+                'reason': 'Exact text content match',
+                'totalSizeSaved': sum(d['file'].get('size', 0) or d['file'].get('sizeBytes', 0) for d in duplicates)
+            })
+            group_index += 1
+    
+    # Group visually similar images by perceptual hash. Exact copies are
+    # represented only by their kept file so they aren't reported twice, and
+    # flat images are skipped since their hashes all look alike
+    max_distance = int((1 - settings.HIGH_SIMILARITY_THRESHOLD) * PHASH_BITS)
+    image_files = [
+        f for f in distinct_files
+        if len(f.get('perceptual_hash') or '') == PHASH_HEX_LENGTH
+        and is_informative_hash(f['perceptual_hash'], max_distance)
+    ]
+    
+    # Embeddings align with the files that have an image; when available they
+    # confirm each hash match, since an 8x8 average hash is coarse
+    embedded_images = [f for f in files if f.get('base64_image')]
+    image_embedding_by_file = {}
+    if image_embeddings and len(image_embeddings) == len(embedded_images):
+        image_embedding_by_file = {id(f): e for f, e in zip(embedded_images, image_embeddings)}
+    
+    similar_image_groups = group_similar_hashes(
+        [f['perceptual_hash'] for f in image_files], max_distance
+    )
+    for member_indices in similar_image_groups:
+        image_group = [image_files[i] for i in member_indices]
+        kept_file = select_keep_file(image_group)
+        kept_hash = int(kept_file['perceptual_hash'], 16)
+        kept_embedding = image_embedding_by_file.get(id(kept_file))
         
-        # Create groups for files with same text content
-        for text_content, text_group in text_content_groups.items():
-            if len(text_group) > 1:
-                # Use tie-breaker logic to select keep file
-                from app.services.tie_breaker import select_keep_file
-                kept_file = select_keep_file(text_group)
-                
-                duplicates = []
-                for duplicate_file in text_group:
-                    if duplicate_file.get('id') != kept_file.get('id') and \
-                       duplicate_file.get('fileName') != kept_file.get('fileName'):
-                        duplicates.append({
-                            'file': duplicate_file,
-                            'similarity': 1.0,  # Exact text match
-                            'reason': 'Exact text content match',
-                            'isKept': False
-                        })
-                
-                groups.append({
-                    'id': f'group_{group_index}',
-                    'groupIndex': group_index,
-                    'keepFile': kept_file,
-                    'duplicates': duplicates,
-                    'reason': 'Exact text content match',
-                    'totalSizeSaved': sum(d['file'].get('size', 0) or d['file'].get('sizeBytes', 0) for d in duplicates)
+        duplicates = []
+        for duplicate_file in image_group:
+            if duplicate_file.get('id') != kept_file.get('id') and \
+               duplicate_file.get('fileName') != kept_file.get('fileName'):
+                embedding = image_embedding_by_file.get(id(duplicate_file))
+                if kept_embedding is not None and embedding is not None and \
+                   cosine_similarity(embedding, kept_embedding) < settings.HIGH_SIMILARITY_THRESHOLD:
+                    continue
+                distance = (int(duplicate_file['perceptual_hash'], 16) ^ kept_hash).bit_count()
+                similarity = 1.0 - distance / PHASH_BITS
+                duplicates.append({
+                    'file': duplicate_file,
+                    'similarity': similarity,
+                    'reason': f'Visual similarity: {round(similarity * 100)}%',
+                    'isKept': False
                 })
-                group_index += 1
+        
+        if not duplicates:
+            continue
+        
+        groups.append({
+            'id': f'group_{group_index}',
+            'groupIndex': group_index,
+            'keepFile': kept_file,
+            'duplicates': duplicates,
+            'reason': 'Visually similar images',
+            'totalSizeSaved': sum(d['file'].get('size', 0) or d['file'].get('sizeBytes', 0) for d in duplicates)
+        })
+        group_index += 1
+    
+    # Group near-duplicate text by embedding similarity, comparing only the
+    # file each exact-text group keeps so a file deleted there can't be
+    # another group's keeper. Embeddings align with the files that have text
+    # content; skip if generation partially failed
+    text_files = [f for f in files if f.get('text_content')]
+    if text_embeddings and len(text_embeddings) == len(text_files):
+        embedding_by_file = {id(f): e for f, e in zip(text_files, text_embeddings)}
+        text_vectors = [embedding_by_file[id(f)] for f in text_representatives]
+        similar_text_groups = group_similar_embeddings(
+            text_vectors, settings.HIGH_SIMILARITY_THRESHOLD
+        )
+        for member_indices in similar_text_groups:
+            text_group = [text_representatives[i] for i in member_indices]
+            kept_file = select_keep_file(text_group)
+            kept_vector = embedding_by_file[id(kept_file)]
+            
+            duplicates = []
+            for duplicate_file in text_group:
+                if duplicate_file.get('id') != kept_file.get('id') and \
+                   duplicate_file.get('fileName') != kept_file.get('fileName'):
+                    similarity = cosine_similarity(embedding_by_file[id(duplicate_file)], kept_vector)
+                    duplicates.append({
+                        'file': duplicate_file,
+                        'similarity': similarity,
+                        'reason': f'Text similarity: {round(similarity * 100)}%',
+                        'isKept': False
+                    })
+            
+            groups.append({
+                'id': f'group_{group_index}',
+                'groupIndex': group_index,
+                'keepFile': kept_file,
+                'duplicates': duplicates,
+                'reason': 'Similar text content',
+                'totalSizeSaved': sum(d['file'].get('size', 0) or d['file'].get('sizeBytes', 0) for d in duplicates)
+            })
+            group_index += 1
     
     return groups
 
@@ -420,5 +517,5 @@ async def create_zip(
         )
         
     except Exception as e:
-        logger.error(f"Error creating ZIP file: {e}", exc_info=True)
+        logger.exception("Error creating ZIP file: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create ZIP file")
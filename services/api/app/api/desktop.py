@@ -1,21 +1,47 @@
 """Desktop app endpoints"""
+import asyncio
 import logging
 import os
+from pathlib import Path
 from typing import List, Dict, Any
-from fastapi import APIRouter, HTTPException
+from cachetools import TTLCache
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import lambda_stmt, select
 from uuid import UUID
 
+from app.core.config import settings
 from app.core.database import AsyncSessionLocal
-from app.api.dedupe import _find_duplicate_groups
+from app.api.dedupe import DedupePreviewRequest, DedupePreviewResponse, _find_duplicate_groups
 from app.services.file_processor import file_processor
-from app.services.ml_client import MLServiceClient
+from app.services.ml_client import ml_client
 from app.models.license_key import LicenseKey
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Processing results for local files keyed by (path, size, mtime_ns, mime_type);
+# a file whose size and modification time are unchanged is not re-read or
+# re-hashed. The MIME type picks the handler, so it is part of the key.
+# Results carry extracted text and a base64 image, so the cache is bounded by
+# their approximate size in bytes rather than by entry count
+PROCESSING_CACHE_MAX_BYTES = 64 * 1024 * 1024
+PROCESSING_RESULT_OVERHEAD_BYTES = 1024  # Hashes, metadata and dict itself
+
+
+def _processing_result_size(file_result: Dict[str, Any]) -> int:
+    """Approximate memory held by a cached processing result"""
+    return (
+        len(file_result.get('text_content') or '')
+        + len(file_result.get('base64_image') or '')
+        + PROCESSING_RESULT_OVERHEAD_BYTES
+    )
+
+
+_processing_cache: TTLCache = TTLCache(
+    maxsize=PROCESSING_CACHE_MAX_BYTES, ttl=3600, getsizeof=_processing_result_size
+)
+
 
 class ValidateLicenseRequest(BaseModel):
     licenseKey: str
@@ -26,17 +52,6 @@ class ValidateLicenseResponse(BaseModel):
     message: str
 
 
-class DedupePreviewRequest(BaseModel):
-    files: List[Dict[str, Any]]
-
-
-class DedupePreviewResponse(BaseModel):
-    uploadId: str
-    files: List[Dict[str, Any]]
-    groups: List[Dict[str, Any]]
-    processing_stats: Dict[str, Any]
-
-
 @router.post("/validate-license", response_model=ValidateLicenseResponse)
 async def validate_license(request: ValidateLicenseRequest):
     """Validate a license key for desktop app"""
@@ -50,20 +65,20 @@ async def validate_license(request: ValidateLicenseRequest):
                 message="Invalid license key format"
             )
         
-        # Find the license key
+        # Find the license key; only its revoked flag is needed
         async with AsyncSessionLocal() as session:
             result = await session.execute(
-                select(LicenseKey).where(LicenseKey.key == key_uuid)
+                lambda_stmt(lambda: select(LicenseKey.revoked).where(LicenseKey.key == key_uuid))
             )
-            license_key = result.scalar_one_or_none()
+            revoked = result.scalar_one_or_none()
         
-        if not license_key:
+        if revoked is None:
             return ValidateLicenseResponse(
                 valid=False,
                 message="License key not found"
             )
         
-        if license_key.revoked:
+        if revoked:
             return ValidateLicenseResponse(
                 valid=False,
                 message="License key has been revoked"
@@ -77,12 +92,15 @@ async def validate_license(request: ValidateLicenseRequest):
         )
         
     except Exception as e:
-        logger.error(f"License validation failed: {e}", exc_info=True)
+        logger.exception("License validation failed: %s", e)
         raise HTTPException(status_code=500, detail="License validation failed")
 
 
 @router.post("/dedupe/preview", response_model=DedupePreviewResponse)
-async def dedupe_preview(request: DedupePreviewRequest):
+async def dedupe_preview(
+    request: DedupePreviewRequest,
+    incremental: bool = Query(True, description="Reuse results for files unchanged since a previous preview")
+):
     """
     Preview duplicates for desktop app
     
@@ -91,116 +109,133 @@ async def dedupe_preview(request: DedupePreviewRequest):
     try:
         import uuid
         upload_id = str(uuid.uuid4())
-        processed_files = []
         all_texts = []
         all_images = []
-        
-        # Initialize ML client
-        ml_client = MLServiceClient()
+        cache_hits = 0
         
         logger.info(f"Processing {len(request.files)} files for desktop app")
-        logger.info(f"Files received: {[f.get('name') for f in request.files]}")
-        
-        # Process each file
-        for i, file_data in enumerate(request.files):
-            try:
-                filename = file_data.get('name', f'file_{i}')
-                file_path = file_data.get('path', '')
-                file_size = file_data.get('size', 0)
-                mime_type = file_data.get('type', 'application/octet-stream')
-                
-                # Read file content from path
-                if not file_path or not os.path.exists(file_path):
-                    raise FileNotFoundError(f"File not found: {file_path}")
-                
-                with open(file_path, 'rb') as f:
-                    file_content = f.read()
-                
-                # Process file using file processor
-                file_result = await file_processor.process_file(
-                    file_data=file_content,
-                    filename=filename,
-                    mime_type=mime_type
-                )
-                
-                # Add file metadata
-                file_result['id'] = f"file_{i}"
-                file_result['fileName'] = filename
-                file_result['sizeBytes'] = file_size
-                file_result['mimeType'] = mime_type
-                file_result['path'] = file_path
-                
-                processed_files.append(file_result)
-                
-                # Collect text and image data for ML processing
-                if file_result.get('text_content'):
-                    all_texts.append(file_result['text_content'])
-                if file_result.get('base64_image'):
-                    all_images.append(file_result['base64_image'])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Files received: %s", [f.get('name') for f in request.files])
+        
+        # Process files concurrently, bounded so a large request doesn't
+        # read every file into memory at once
+        semaphore = asyncio.Semaphore(settings.PROCESSING_CONCURRENCY)
+        
+        async def process_with_limit(i: int, file_data: Dict[str, Any]) -> Dict[str, Any]:
+            nonlocal cache_hits
+            async with semaphore:
+                try:
+                    filename = file_data.get('name', f'file_{i}')
+                    file_path = file_data.get('path', '')
+                    file_size = file_data.get('size', 0)
+                    mime_type = file_data.get('type', 'application/octet-stream')
+                    
+                    if not file_path:
+                        raise FileNotFoundError(f"File not found: {file_path}")
+                    try:
+                        stat = await asyncio.to_thread(os.stat, file_path)
+                    except OSError:
+                        raise FileNotFoundError(f"File not found: {file_path}")
+                    
+                    cache_key = (file_path, stat.st_size, stat.st_mtime_ns, mime_type)
+                    cached_result = _processing_cache.get(cache_key) if incremental else None
+                    if cached_result is not None:
+                        file_result = dict(cached_result)
+                        cache_hits += 1
+                    else:
+                        # Read file content from path without blocking the event loop
+                        file_content = await asyncio.to_thread(Path(file_path).read_bytes)
+                        
+                        # Process file using file processor
+                        file_result = await file_processor.process_file(
+                            file_data=file_content,
+                            filename=filename,
+                            mime_type=mime_type
+                        )
+                        # Results bigger than the whole cache are not kept
+                        if file_result.get('success') and \
+                           _processing_result_size(file_result) <= PROCESSING_CACHE_MAX_BYTES:
+                            _processing_cache[cache_key] = dict(file_result)
                     
-            except Exception as e:
-                logger.error(f"Failed to process file {i}: {e}", exc_info=True)
-                # Add failed file to results
-                processed_files.append({
-                    'id': f"file_{i}",
-                    'fileName': file_data.get('name', f'file_{i}'),
-                    'sizeBytes': file_data.get('size', 0),
-                    'mimeType': file_data.get('type', 'application/octet-stream'),
-                    'success': False,
-                    'error': str(e)
-                })
+                    # Add file metadata
+                    file_result['id'] = f"file_{i}"
+                    file_result['fileName'] = filename
+                    file_result['sizeBytes'] = file_size
+                    file_result['mimeType'] = mime_type
+                    file_result['path'] = file_path
+                    
+                    return file_result
+                    
+                except Exception as e:
+                    logger.exception("Failed to process file %s: %s", i, e)
+                    # Add failed file to results
+                    return {
+                        'id': f"file_{i}",
+                        'fileName': file_data.get('name', f'file_{i}'),
+                        'sizeBytes': file_data.get('size', 0),
+                        'mimeType': file_data.get('type', 'application/octet-stream'),
+                        'success': False,
+                        'error': str(e)
+                    }
+        
+        # gather preserves request order, which the embedding alignment relies on
+        processed_files = await asyncio.gather(
+            *(process_with_limit(i, file_data) for i, file_data in enumerate(request.files))
+        )
+        
+        # Collect text and image data for ML processing, their SHA-256 cache
+        # keys and the success count in a single pass
+        text_hashes = []
+        image_hashes = []
+        successful_files = 0
+        for file_result in processed_files:
+            successful_files += bool(file_result.get('success', False))
+            file_hash = file_result.get('sha256') or file_result.get('file_hash', '')
+            if file_result.get('text_content'):
+                all_texts.append(file_result['text_content'])
+                text_hashes.append(file_hash)
+            if file_result.get('base64_image'):
+                all_images.append(file_result['base64_image'])
+                image_hashes.append(file_hash)
         
         # Generate embeddings for text and images with SHA-256 caching
-        text_embeddings = []
-        image_embeddings = []
-        
-        if all_texts:
-            try:
-                from app.services.embedding_cache import embedding_cache
-                # Extract SHA-256 hashes for caching
-                text_hashes = []
-                for file_result in processed_files:
-                    if file_result.get('text_content'):
-                        text_hashes.append(file_result.get('sha256') or file_result.get('file_hash', ''))
-                
-                # Ensure arrays are aligned
-                if len(text_hashes) != len(all_texts):
-                    while len(text_hashes) < len(all_texts):
-                        text_hashes.append('')
-                
-                text_embeddings, _ = await embedding_cache.get_or_generate_text_embeddings(
-                    all_texts, text_hashes
-                )
-            except Exception as e:
-                logger.error(f"Text embedding generation failed: {e}")
+        async def _generate_text_embeddings() -> List[List[float]]:
+            text_embeddings = []
+            if all_texts:
                 try:
-                    text_embeddings = await ml_client.generate_text_embeddings(all_texts)
-                except:
-                    pass
-        
-        if all_images:
-            try:
-                from app.services.embedding_cache import embedding_cache
-                # Extract SHA-256 hashes for caching
-                image_hashes = []
-                for file_result in processed_files:
-                    if file_result.get('base64_image'):
-                        image_hashes.append(file_result.get('sha256') or file_result.get('file_hash', ''))
-                
-                # Ensure arrays are aligned
-                if len(image_hashes) != len(all_images):
-                    while len(image_hashes) < len(all_images):
-                        image_hashes.append('')
-                
-                image_embeddings, _ = await embedding_cache.get_or_generate_image_embeddings(
-                    all_images, image_hashes
-                )
-            except Exception as e:
-                logger.error(f"Image embedding generation failed: {e}")
+                    from app.services.embedding_cache import embedding_cache
+                    text_embeddings, _ = await embedding_cache.get_or_generate_text_embeddings(
+                        all_texts, text_hashes
+                    )
+                except Exception as e:
+                    logger.error(f"Text embedding generation failed: {e}")
+                    try:
+                        text_embeddings = await ml_client.generate_text_embeddings(all_texts)
+                    except:
+                        pass
+            return text_embeddings
+        
+        async def _generate_image_embeddings() -> List[List[float]]:
+            image_embeddings = []
+            if all_images:
                 try:
-                    image_embeddings = await ml_client.generate_image_embeddings(all_images)
-                except:
-                    pass
+                    from app.services.embedding_cache import embedding_cache
+                    image_embeddings, _ = await embedding_cache.get_or_generate_image_embeddings(
+                        all_images, image_hashes
+                    )
+                except Exception as e:
+                    logger.error(f"Image embedding generation failed: {e}")
+                    try:
+                        image_embeddings = await ml_client.generate_image_embeddings(all_images)
+                    except:
+                        pass
+            return image_embeddings
+        
+        # Text and image embeddings are independent, so request them concurrently
+        text_embeddings, image_embeddings = await asyncio.gather(
+            _generate_text_embeddings(),
+            _generate_image_embeddings(),
+        )
         
         # Find duplicate groups using similarity
         groups = await _find_duplicate_groups(processed_files, text_embeddings, image_embeddings)
@@ -209,13 +244,14 @@ async def dedupe_preview(request: DedupePreviewRequest):
         # Calculate processing statistics
         processing_stats = {
             'total_files': len(processed_files),
-            'successful_files': len([f for f in processed_files if f.get('success', False)]),
-            'text_files': len([f for f in processed_files if f.get('text_content')]),
-            'image_files': len([f for f in processed_files if f.get('base64_image')]),
+            'successful_files': successful_files,
+            'text_files': len(all_texts),
+            'image_files': len(all_images),
             'duplicate_groups': len(groups),
             'total_duplicates': sum(len(g.get('duplicates', [])) for g in groups),
             'text_embeddings_generated': len(text_embeddings),
-            'image_embeddings_generated': len(image_embeddings)
+            'image_embeddings_generated': len(image_embeddings),
+            'processing_cache_hits': cache_hits
         }
         
         logger.info(f"Desktop dedupe processing complete: {processing_stats}")
@@ -228,5 +264,5 @@ async def dedupe_preview(request: DedupePreviewRequest):
         )
         
     except Exception as e:
-        logger.error(f"Desktop dedupe preview failed: {e}", exc_info=True)
+        logger.exception("Desktop dedupe preview failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
@@ -1,6 +1,7 @@
 """
 File upload and processing endpoints
 """
+import asyncio
 import logging
 from typing import List, Dict, Any
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
@@ -65,13 +66,6 @@ async def upload_and_process_files(
         # Check user quota
         from app.services.quota_manager import quota_manager
         
-        # Check upload count quota
-        if not await quota_manager.check_user_upload_count(user.id):
-            raise HTTPException(
-                status_code=429,
-                detail="Upload limit reached. Please delete old uploads to free up space."
-            )
-        
         # Calculate total size for quota check
         total_size = 0
         for file in files:
@@ -81,8 +75,21 @@ async def upload_and_process_files(
             # Reset file pointer
             await file.seek(0)
         
+        # Both checks open their own DB session, so run them concurrently
+        within_upload_count, within_storage = await asyncio.gather(
+            quota_manager.check_user_upload_count(user.id),
+            quota_manager.check_user_storage_quota(user.id, total_size),
+        )
+        
+        # Check upload count quota
+        if not within_upload_count:
+            raise HTTPException(
+                status_code=429,
+                detail="Upload limit reached. Please delete old uploads to free up space."
+            )
+        
         # Check storage quota
-        if not await quota_manager.check_user_storage_quota(user.id, total_size):
+        if not within_storage:
             raise HTTPException(
                 status_code=429,
                 detail="Storage quota exceeded. Please delete old files to free up space."
@@ -179,7 +186,7 @@ async def upload_and_process_files(
                     logger.error(f"Failed to process file: {file.filename} - {result.get('error', 'Unknown error')}")
                     
             except Exception as e:
-                logger.error(f"Error processing file {file.filename}: {e}", exc_info=True)
+                logger.exception("Error processing file %s: %s", file.filename, e)
                 failed_count += 1
                 
                 # Add failed result
@@ -227,8 +234,10 @@ async def upload_and_process_files(
             groups=groups
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"File upload processing failed: {e}", exc_info=True)
+        logger.exception("File upload processing failed: %s", e)
         raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
 
 
@@ -261,7 +270,7 @@ async def process_single_file(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Single file processing failed: {e}", exc_info=True)
+        logger.exception("Single file processing failed: %s", e)
         raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
 
 
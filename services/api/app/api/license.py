@@ -1,8 +1,8 @@
 """License management endpoints"""
 import logging
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
@@ -29,6 +29,7 @@ class GenerateLicenseResponse(BaseModel):
 
 class ListLicensesResponse(BaseModel):
     licenses: List[LicenseResponse]
+    nextOffset: Optional[int] = None  # Offset of the next page, None on the last
 
 
 class RevokeLicenseResponse(BaseModel):
@@ -55,59 +56,60 @@ async def generate_license(
         )
         
     except Exception as e:
-        logger.error(f"Failed to generate license key: {e}", exc_info=True)
+        logger.exception("Failed to generate license key: %s", e)
         raise HTTPException(status_code=500, detail="Failed to generate license key")
 
 
 @router.get("/list", response_model=ListLicensesResponse)
 async def list_licenses(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
     user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
-    """List all license keys for the current user"""
+    """List license keys for the current user, newest first"""
     try:
-        # Get all license keys for the user
+        # Page through the user's license keys in SQL, fetching only the
+        # columns the response needs as plain rows. One extra row tells us
+        # whether another page follows without a separate COUNT
         result = await session.execute(
-            select(LicenseKey)
+            select(LicenseKey.key, LicenseKey.createdAt, LicenseKey.revoked)
             .where(LicenseKey.userId == user.id)
             .order_by(LicenseKey.createdAt.desc())
+            .limit(limit + 1)
+            .offset(offset)
         )
-        licenses = result.scalars().all()
+        rows = result.all()
         
         return ListLicensesResponse(
             licenses=[
                 LicenseResponse(
-                    key=str(license.key),
-                    createdAt=license.createdAt.isoformat(),
-                    revoked=license.revoked
+                    key=str(key),
+                    createdAt=created_at.isoformat(),
+                    revoked=revoked
                 )
-                for license in licenses
-            ]
+                for key, created_at, revoked in rows[:limit]
+            ],
+            nextOffset=offset + limit if len(rows) > limit else None
         )
         
     except Exception as e:
-        logger.error(f"Failed to list license keys: {e}", exc_info=True)
+        logger.exception("Failed to list license keys: %s", e)
         raise HTTPException(status_code=500, detail="Failed to list license keys")
 
 
 @router.delete("/{key}", response_model=RevokeLicenseResponse)
 async def revoke_license(
-    key: str,
+    key: UUID,
     user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
     """Revoke a license key"""
     try:
-        # Convert key string to UUID
-        try:
-            key_uuid = UUID(key)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid license key format")
-        
-        # Find the license key
+        # Find the license key (key format is validated by FastAPI)
         result = await session.execute(
             select(LicenseKey)
-            .where(LicenseKey.key == key_uuid)
+            .where(LicenseKey.key == key)
             .where(LicenseKey.userId == user.id)
         )
         license_key = result.scalar_one_or_none()
@@ -129,5 +131,5 @@ async def revoke_license(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to revoke license key: {e}", exc_info=True)
+        logger.exception("Failed to revoke license key: %s", e)
         raise HTTPException(status_code=500, detail="Failed to revoke license key")
@@ -17,16 +17,12 @@ async def get_user_quota(user=Depends(get_current_user)):
     
     Returns quota usage statistics including storage used, file counts, etc.
     """
-    try:
-        quota_info = await quota_manager.get_user_quota_info(user.id)
-        
-        return {
-            "user_id": user.id,
-            "email": user.email,
-            "quota": quota_info
-        }
-        
-    except Exception as e:
-        logger.error(f"Error fetching quota info: {e}", exc_info=True)
-        raise
+    # get_user_quota_info handles its own errors and never raises
+    quota_info = await quota_manager.get_user_quota_info(user.id)
+    
+    return {
+        "user_id": user.id,
+        "email": user.email,
+        "quota": quota_info
+    }
 
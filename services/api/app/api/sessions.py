@@ -3,12 +3,17 @@ Upload API with Session Management
 Handles file uploads to temporary storage and session creation
 """
 import os
+import asyncio
 import logging
 from pathlib import Path
 from typing import List, Optional
+from uuid import UUID
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, BackgroundTasks
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+import aiofiles
 
+from app.core.config import settings
 from app.middleware.auth import get_current_user
 from app.services.session_manager import session_manager
 from app.services.background_worker import background_worker
@@ -16,6 +21,9 @@ from app.services.background_worker import background_worker
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Uploads are copied to disk in 1 MiB chunks rather than read whole
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 class UploadSessionResponse(BaseModel):
     session_id: str
     status: str
@@ -33,6 +41,54 @@ class SessionStatusResponse(BaseModel):
     processing_stats: dict
     error_message: Optional[str] = None
 
+def _unique_filenames(filenames: List[str]) -> List[str]:
+    """On-disk names for a batch of uploads, suffixing repeats as "name (1).ext"
+
+    Uploads from different folders often share a name; saving them to the
+    same path concurrently would interleave their contents.
+    """
+    taken = set()
+    unique = []
+    for filename in filenames:
+        candidate = filename
+        path = Path(filename)
+        n = 1
+        while candidate in taken:
+            candidate = f"{path.stem} ({n}){path.suffix}"
+            n += 1
+        taken.add(candidate)
+        unique.append(candidate)
+    return unique
+
+async def _load_session(session_id: UUID):
+    """Get a session from memory, falling back to its saved state on disk"""
+    key = str(session_id)
+    session = await session_manager.get_session(key)
+    if not session:
+        session = await session_manager.load_session_state(key)
+        if session:
+            session_manager.sessions[key] = session
+    return session
+
+def _session_status(session) -> SessionStatusResponse:
+    """Build a status response from a session without re-validating it
+    
+    Session fields are written only by the session manager and background
+    worker, so they already have the declared types; skipping validation
+    avoids copying every duplicate group on each status poll.
+    """
+    return SessionStatusResponse.model_construct(
+        session_id=session.session_id,
+        status=session.status,
+        progress=session.progress,
+        total_files=session.total_files,
+        processed_files=session.processed_files,
+        failed_files=session.failed_files,
+        duplicate_groups=session.duplicate_groups,
+        processing_stats=session.processing_stats,
+        error_message=session.error_message
+    )
+
 @router.post("/upload", response_model=UploadSessionResponse)
 async def upload_files_to_session(
     files: List[UploadFile] = File(...),
@@ -51,26 +107,35 @@ async def upload_files_to_session(
         # temp_dir is already set to absolute path in create_session
         logger.info(f"Saving files to: {session.temp_dir} (absolute: {session.temp_dir.is_absolute()})")
         
-        # Save uploaded files to session directory
-        uploaded_count = 0
-        for file in files:
-            try:
-                # Save file to session temp directory (use absolute path)
-                file_path = session.temp_dir / file.filename
-                
-                # Read file content
-                content = await file.read()
-                
-                # Write to temp file
-                with open(file_path, 'wb') as f:
-                    f.write(content)
-                
-                uploaded_count += 1
-                logger.info(f"Saved file {file.filename} ({len(content)} bytes) to {file_path}")
-                
-            except Exception as e:
-                logger.error(f"Failed to save file {file.filename}: {e}", exc_info=True)
-                continue
+        # Save uploaded files to session directory concurrently, bounded so a
+        # large batch doesn't open every file at once
+        semaphore = asyncio.Semaphore(settings.PROCESSING_CONCURRENCY)
+        
+        async def save_file(file: UploadFile, filename: str) -> bool:
+            async with semaphore:
+                try:
+                    # Save file to session temp directory (use absolute path)
+                    file_path = session.temp_dir / filename
+                    
+                    # Stream to temp file without blocking the event loop
+                    size = 0
+                    async with aiofiles.open(file_path, 'wb') as f:
+                        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                            await f.write(chunk)
+                            size += len(chunk)
+                    
+                    logger.info(f"Saved file {file.filename} ({size} bytes) to {file_path}")
+                    return True
+                    
+                except Exception as e:
+                    logger.exception("Failed to save file %s: %s", file.filename, e)
+                    return False
+        
+        filenames = _unique_filenames([file.filename for file in files])
+        saved = await asyncio.gather(
+            *(save_file(file, filename) for file, filename in zip(files, filenames))
+        )
+        uploaded_count = sum(saved)
         
         if uploaded_count == 0:
             await session_manager.cleanup_session(session.session_id)
@@ -93,13 +158,15 @@ async def upload_files_to_session(
             upload_url=f"/api/sessions/{session.session_id}"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 @router.get("/sessions/{session_id}", response_model=SessionStatusResponse)
 async def get_session_status(
-    session_id: str,
+    session_id: UUID,
     user=Depends(get_current_user)
 ):
     """
@@ -107,12 +174,7 @@ async def get_session_status(
     """
     try:
         # Get session from memory or load from file
-        session = await session_manager.get_session(session_id)
-        if not session:
-            # Try to load from file
-            session = await session_manager.load_session_state(session_id)
-            if session:
-                session_manager.sessions[session_id] = session
+        session = await _load_session(session_id)
         
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -121,17 +183,8 @@ async def get_session_status(
         if session.user_id != user.id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        return SessionStatusResponse(
-            session_id=session.session_id,
-            status=session.status,
-            progress=session.progress,
-            total_files=session.total_files,
-            processed_files=session.processed_files,
-            failed_files=session.failed_files,
-            duplicate_groups=session.duplicate_groups,
-            processing_stats=session.processing_stats,
-            error_message=session.error_message
-        )
+        # Returning a Response skips FastAPI's response_model re-validation
+        return ORJSONResponse(_session_status(session).model_dump())
         
     except HTTPException:
         raise
@@ -147,27 +200,17 @@ async def list_user_sessions(
     List all sessions for the current user
     """
     try:
-        logger.info(f"Listing sessions for user {user.email} (ID: {user.id})")
-        logger.info(f"Session manager temp_base_dir: {session_manager.temp_base_dir}")
-        logger.info(f"Temp dir exists: {session_manager.temp_base_dir.exists()}")
-        logger.info(f"Sessions in memory: {len(session_manager.sessions)}")
+        logger.debug(
+            "Listing sessions for user %s (ID: %s), %d sessions in memory",
+            user.email, user.id, len(session_manager.sessions)
+        )
         
         user_sessions = []
         
         # Get sessions from memory
         for session in session_manager.sessions.values():
             if session.user_id == user.id:
-                user_sessions.append(SessionStatusResponse(
-                    session_id=session.session_id,
-                    status=session.status,
-                    progress=session.progress,
-                    total_files=session.total_files,
-                    processed_files=session.processed_files,
-                    failed_files=session.failed_files,
-                    duplicate_groups=session.duplicate_groups,
-                    processing_stats=session.processing_stats,
-                    error_message=session.error_message
-                ))
+                user_sessions.append(_session_status(session))
         
         # Also check for sessions in temp directory
         temp_dir = session_manager.temp_base_dir
@@ -178,28 +221,18 @@ async def list_user_sessions(
                     if session_id not in session_manager.sessions:
                         session = await session_manager.load_session_state(session_id)
                         if session and session.user_id == user.id:
-                            user_sessions.append(SessionStatusResponse(
-                                session_id=session.session_id,
-                                status=session.status,
-                                progress=session.progress,
-                                total_files=session.total_files,
-                                processed_files=session.processed_files,
-                                failed_files=session.failed_files,
-                                duplicate_groups=session.duplicate_groups,
-                                processing_stats=session.processing_stats,
-                                error_message=session.error_message
-                            ))
-        
-        logger.info(f"Returning {len(user_sessions)} sessions for user {user.email}")
-        return user_sessions
+                            user_sessions.append(_session_status(session))
+        
+        logger.debug("Returning %d sessions for user %s", len(user_sessions), user.email)
+        return ORJSONResponse([status.model_dump() for status in user_sessions])
         
     except Exception as e:
-        logger.error(f"Failed to list sessions: {e}", exc_info=True)
+        logger.exception("Failed to list sessions: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to list sessions: {str(e)}")
 
 @router.post("/sessions/{session_id}/cleanup")
 async def cleanup_session_files(
-    session_id: str,
+    session_id: UUID,
     request: dict,
     user=Depends(get_current_user)
 ):
@@ -207,9 +240,7 @@ async def cleanup_session_files(
     Create cleaned files by removing selected duplicates
     """
     try:
-        session = await session_manager.get_session(session_id)
-        if not session:
-            session = await session_manager.load_session_state(session_id)
+        session = await _load_session(session_id)
         
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -234,7 +265,7 @@ async def cleanup_session_files(
             temp_dir_path = session_manager.temp_base_dir / temp_dir_path.name
             logger.warning(f"temp_dir was relative, converted to: {temp_dir_path}")
         
-        logger.info(f"Session temp_dir: {temp_dir_path} (exists: {temp_dir_path.exists()})")
+        logger.debug("Session temp_dir: %s", temp_dir_path)
         
         # Create cleaned files by excluding selected duplicates
         # selected_file_ids contains files to REMOVE, so we keep everything else
@@ -302,19 +333,16 @@ async def cleanup_session_files(
                         'name': file_name,
                         'path': str(uploaded_file)
                     })
-                    logger.info(f"Added unique file (not in any group): {file_name}")
+                    logger.debug("Added unique file (not in any group): %s", file_name)
         
-        logger.info(f"Reading files from temp_dir: {temp_dir_path} (exists: {temp_dir_path.exists()})")
-        if temp_dir_path.exists():
-            all_files_in_dir = list(temp_dir_path.iterdir())
-            file_list = [f.name for f in all_files_in_dir if f.is_file() and f.name != "results.json"]
-            logger.info(f"Actual files in temp_dir ({len(file_list)}): {file_list}")
-        else:
+        if not temp_dir_path.exists():
             logger.error(f"Temp directory does not exist: {temp_dir_path}")
             raise HTTPException(status_code=404, detail=f"Session files not found. They may have been cleaned up.")
         
-        logger.info(f"Creating ZIP with {len(files_to_keep)} files to keep (excluding {len(selected_file_ids)} selected for removal)")
-        logger.info(f"Files to keep details: {[f.get('fileName') or f.get('name') or f.get('id') for f in files_to_keep[:5]]}")
+        logger.info(
+            "Creating ZIP with %d files to keep (excluding %d selected for removal)",
+            len(files_to_keep), len(selected_file_ids)
+        )
         
         # Create ZIP file with cleaned files
         import zipfile
@@ -326,8 +354,8 @@ async def cleanup_session_files(
         
         # Create a mapping of all files in temp_dir by name for quick lookup
         files_in_dir_map = {f.name: f for f in temp_dir_path.iterdir() if f.is_file() and f.name != "results.json"}
-        logger.info(f"Files in directory map ({len(files_in_dir_map)}): {list(files_in_dir_map.keys())}")
-        logger.info(f"Files to keep count: {len(files_to_keep)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Files in directory map (%d): %s", len(files_in_dir_map), list(files_in_dir_map))
         
         # If no files to keep, but we have files in directory, include all files (user selected all duplicates)
         if len(files_to_keep) == 0 and len(files_in_dir_map) > 0:
@@ -344,8 +372,6 @@ async def cleanup_session_files(
             files_added = 0
             seen_filenames = set()  # Track added files to avoid duplicates
             
-            logger.info(f"Starting ZIP creation with {len(files_to_keep)} files to process")
-            
             for idx, file_info in enumerate(files_to_keep):
                 try:
                     # Get filename from file_info - try multiple fields
@@ -354,7 +380,11 @@ async def cleanup_session_files(
                                (file_info.get('id', 'unknown').replace('file_', '') if file_info.get('id', '').startswith('file_') else file_info.get('id', 'unknown')) or 
                                'unknown')
                     
-                    logger.info(f"[{idx+1}/{len(files_to_keep)}] Processing: id={file_info.get('id')}, fileName={file_info.get('fileName')}, name={file_info.get('name')}, resolved_filename={filename}")
+                    logger.debug(
+                        "[%d/%d] Processing: id=%s, fileName=%s, name=%s, resolved_filename=%s",
+                        idx + 1, len(files_to_keep), file_info.get('id'),
+                        file_info.get('fileName'), file_info.get('name'), filename
+                    )
                     
                     # Try to find the file in the directory
                     file_path = None
@@ -362,7 +392,7 @@ async def cleanup_session_files(
                     # First, try exact filename match
                     if filename in files_in_dir_map:
                         file_path = files_in_dir_map[filename]
-                        logger.info(f"  → Exact match found: {filename}")
+                        logger.debug("  → Exact match found: %s", filename)
                     else:
                         # Try to match by any variation
                         matched = False
@@ -377,7 +407,10 @@ async def cleanup_session_files(
                                 file_path = existing_path
                                 filename = existing_name  # Use the actual filename from disk
                                 matched = True
-                                logger.info(f"  → Matched by variation: {filename} (was looking for {file_info.get('fileName')})")
+                                logger.debug(
+                                    "  → Matched by variation: %s (was looking for %s)",
+                                    filename, file_info.get('fileName')
+                                )
                                 break
                         
                         if not matched:
@@ -391,14 +424,14 @@ async def cleanup_session_files(
                             zipf.writestr(filename, file_content)
                             files_added += 1
                             seen_filenames.add(filename)
-                            logger.info(f"  ✓ Added {filename} ({len(file_content)} bytes) to ZIP")
+                            logger.debug("  ✓ Added %s (%d bytes) to ZIP", filename, len(file_content))
                         else:
                             logger.warning(f"  ⊗ Skipping duplicate: {filename}")
                     else:
                         logger.warning(f"  ✗ File not found: {filename}. Available: {list(files_in_dir_map.keys())[:5]}...")
                         
                 except Exception as e:
-                    logger.error(f"Failed to add file {file_info.get('fileName', 'unknown')} to ZIP: {e}", exc_info=True)
+                    logger.exception("Failed to add file %s to ZIP: %s", file_info.get('fileName', 'unknown'), e)
                     continue
             
             if files_added == 0:
@@ -407,7 +440,7 @@ async def cleanup_session_files(
                 logger.error(f"Files to keep IDs/names: {[f.get('id') or f.get('fileName') or f.get('name') for f in files_to_keep]}")
                 raise HTTPException(status_code=500, detail="No files could be added to ZIP. Check server logs for details.")
             
-            logger.info(f"Successfully created ZIP with {files_added} files")
+            logger.info("Successfully created ZIP with %d files", files_added)
         
         # Return file as streaming response
         from fastapi.responses import StreamingResponse
@@ -437,16 +470,14 @@ async def cleanup_session_files(
 
 @router.delete("/sessions/{session_id}")
 async def delete_session(
-    session_id: str,
+    session_id: UUID,
     user=Depends(get_current_user)
 ):
     """
     Delete a session and its files
     """
     try:
-        session = await session_manager.get_session(session_id)
-        if not session:
-            session = await session_manager.load_session_state(session_id)
+        session = await _load_session(session_id)
         
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -456,7 +487,7 @@ async def delete_session(
             raise HTTPException(status_code=403, detail="Access denied")
         
         # Clean up session
-        await session_manager.cleanup_session(session_id)
+        await session_manager.cleanup_session(str(session_id))
         
         return {"message": "Session deleted successfully"}
         
@@ -1,7 +1,7 @@
 """Configuration settings optimized for Render deployment"""
 import os
 from typing import List, Union
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import field_validator
 
 
@@ -13,9 +13,13 @@ class Settings(BaseSettings):
     PORT: int = 3001  # Render uses $PORT
     HOST: str = "0.0.0.0"
     LOG_LEVEL: str = "INFO"
+    DEBUG: bool = False  # Enables SQL statement logging
     
     # Database (Neon PostgreSQL)
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Recycle before Neon drops idle connections
     
     # Security
     SESSION_SECRET: str
@@ -40,6 +44,7 @@ class Settings(BaseSettings):
     MAX_TOTAL_UPLOAD_SIZE_MB: int = 500  # Maximum total upload size
     MAX_FILES_PER_UPLOAD: int = 100  # Maximum files per upload
     UPLOAD_DIR: str = "/tmp/uploads"  # Render uses /tmp for temp storage
+    PROCESSING_CONCURRENCY: int = 8  # Files processed at once per session
     
     # User Quotas
     MAX_STORAGE_PER_USER_MB: int = 1000  # 1GB per user
@@ -63,10 +68,11 @@ class Settings(BaseSettings):
     ML_SERVICE_URL: str = "http://localhost:3002"
     ML_SERVICE_TIMEOUT: int = 30
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
-        extra = "ignore"  # Ignore extra fields from .env that aren't in Settings
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=True,
+        extra="ignore",  # Ignore extra fields from .env that aren't in Settings
+    )
 
 
 settings = Settings()
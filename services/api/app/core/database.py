@@ -1,4 +1,5 @@
 """Database connection using SQLAlchemy (Neon PostgreSQL)"""
+import asyncio
 import logging
 from typing import AsyncGenerator
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
@@ -38,10 +39,11 @@ database_url = urlunparse((
 # Neon requires SSL, so we pass it via connect_args
 engine = create_async_engine(
     database_url,
-    echo=False,  # Set to True for SQL logging in development
-    pool_size=10,
-    max_overflow=20,
+    echo=settings.DEBUG,  # SQL logging only when DEBUG is set
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
     pool_pre_ping=True,  # Verify connections before using them
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
     connect_args={"ssl": "require"} if "neon.tech" in settings.DATABASE_URL or "amazonaws.com" in settings.DATABASE_URL else {},
 )
 
@@ -66,6 +68,31 @@ async def init_db():
     except Exception as e:
         logger.error(f"❌ Database connection failed: {e}")
         raise
+    
+    await warm_pool()
+
+
+async def warm_pool():
+    """Open pool_size connections up front so the first burst of requests doesn't pay connect latency"""
+    async def _open():
+        return await engine.connect()
+    
+    results = await asyncio.gather(
+        *(_open() for _ in range(settings.DB_POOL_SIZE)),
+        return_exceptions=True
+    )
+    opened = 0
+    for conn in results:
+        if isinstance(conn, BaseException):
+            continue
+        # Closing returns the connection to the pool rather than disconnecting
+        await conn.close()
+        opened += 1
+    
+    if opened < len(results):
+        logger.warning(f"Connection pool warmed with {opened}/{len(results)} connections")
+    else:
+        logger.info(f"Connection pool warmed with {opened} connections")
 
 
 async def close_db():
@@ -2,12 +2,26 @@
 Pino-style structured logging setup
 """
 import logging
+import logging.handlers
+import queue
 import sys
-import json
-from datetime import datetime
-from typing import Any, Dict
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 from pathlib import Path
 
+from app.core.serializer import dumps
+
+
+# LogRecord attributes that are not user-supplied `extra` fields
+RESERVED_RECORD_ATTRS = frozenset({
+    'name', 'msg', 'args', 'created', 'filename', 'funcName',
+    'levelname', 'levelno', 'lineno', 'module', 'msecs', 'message',
+    'pathname', 'process', 'processName', 'relativeCreated', 'thread',
+    'threadName', 'exc_info', 'exc_text', 'stack_info', 'hostname',
+    'taskName',
+})
+
 
 class JSONFormatter(logging.Formatter):
     """JSON formatter for structured logging (Pino-style)"""
@@ -15,10 +29,10 @@ class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         log_data: Dict[str, Any] = {
             'level': record.levelname.lower(),
-            'time': datetime.utcnow().isoformat() + 'Z',
+            'time': datetime.fromtimestamp(record.created, timezone.utc),
             'msg': record.getMessage(),
             'pid': record.process,
-            'hostname': record.hostname if hasattr(record, 'hostname') else 'unknown',
+            'hostname': getattr(record, 'hostname', 'unknown'),
         }
         
         # Add logger name
@@ -35,14 +49,106 @@ class JSONFormatter(logging.Formatter):
         
         # Add extra fields from record
         for key, value in record.__dict__.items():
-            if key not in ['name', 'msg', 'args', 'created', 'filename', 'funcName', 
-                          'levelname', 'levelno', 'lineno', 'module', 'msecs', 'message',
-                          'pathname', 'process', 'processName', 'relativeCreated', 'thread',
-                          'threadName', 'exc_info', 'exc_text', 'stack_info', 'hostname']:
-                if not key.startswith('_'):
-                    log_data[key] = value
+            if key not in RESERVED_RECORD_ATTRS and not key.startswith('_'):
+                log_data[key] = value
         
-        return json.dumps(log_data)
+        # The shared serializer renders the UTC datetime as ISO-8601 with a trailing Z
+        return dumps(log_data).decode()
+
+
+class BufferedFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that batches formatted records into one write per flush
+    
+    Flushes when `capacity` records are buffered, immediately for ERROR and
+    above, and otherwise every `flush_interval` seconds from a daemon thread.
+    The file is opened lazily on the first flush and rotated once it would
+    grow past `max_bytes`.
+    """
+    
+    def __init__(
+        self,
+        filename: str,
+        capacity: int = 1024,
+        flush_interval: float = 1.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        backup_count: int = 5,
+    ):
+        super().__init__(
+            filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding='utf-8',
+            delay=True,
+        )
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._buffer: List[str] = []
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, name='log-flush', daemon=True
+        )
+        self._flusher.start()
+    
+    def emit(self, record: logging.LogRecord):
+        try:
+            self._buffer.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._buffer) >= self.capacity or record.levelno >= logging.ERROR:
+            self.flush()
+    
+    def flush(self):
+        with self.lock:
+            if not self._buffer:
+                return
+            data = ''.join(self._buffer)
+            if self.stream is None:
+                self.stream = self._open()
+            # tell() counts bytes, so compare the encoded size, not characters
+            if self.maxBytes > 0 and \
+               self.stream.tell() + len(data.encode(self.encoding or 'utf-8')) >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(data)
+            self._buffer.clear()
+            self.stream.flush()
+    
+    def _flush_periodically(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+    
+    def close(self):
+        self._stop_event.set()
+        self.flush()
+        super().close()
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler for an in-process listener
+    
+    The stock prepare() pre-formats each record and strips exc_info so it can
+    be pickled; records here never leave the process, so pass them through and
+    let the target handler's formatter see the original record.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# Background listener that writes queued records to file handlers
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def stop_logging():
+    """Flush queued records and stop the background log writer"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        for handler in _queue_listener.handlers:
+            handler.close()
+        _queue_listener = None
 
 
 def setup_logging(
@@ -66,6 +172,7 @@ def setup_logging(
     logger.setLevel(getattr(logging, level.upper(), logging.INFO))
     
     # Remove existing handlers
+    stop_logging()
     logger.handlers.clear()
     
     # Create formatter
@@ -87,9 +194,17 @@ def setup_logging(
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
         
-        file_handler = logging.FileHandler(log_file)
+        file_handler = BufferedFileHandler(log_file)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        
+        # Write to disk from a listener thread so callers never block on file I/O
+        global _queue_listener
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(LocalQueueHandler(log_queue))
+        _queue_listener = logging.handlers.QueueListener(
+            log_queue, file_handler, respect_handler_level=True
+        )
+        _queue_listener.start()
     
     return logger
 
@@ -0,0 +1,20 @@
+"""
+Shared JSON serialization built on orjson
+"""
+from typing import Any
+
+import orjson
+
+# Aware datetimes render as ISO-8601 with a trailing Z; UUIDs and datetimes
+# are encoded natively, anything else orjson can't handle falls back to str()
+DUMPS_OPTIONS = orjson.OPT_UTC_Z
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize an object to JSON bytes"""
+    return orjson.dumps(obj, default=str, option=DUMPS_OPTIONS)
+
+
+def loads(data: bytes | str) -> Any:
+    """Deserialize JSON bytes or text"""
+    return orjson.loads(data)
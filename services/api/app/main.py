@@ -8,17 +8,19 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.core.config import settings
 from app.core.database import init_db, close_db
 from app.api import auth, license, dedupe, desktop, health, files, sessions, metrics, quota
 from app.services.background_worker import background_worker
+from app.services.ml_client import ml_client
 from app.middleware.rate_limit import RateLimitMiddleware
 from app.middleware.validation import RequestValidationMiddleware
 from app.middleware.metrics import MetricsMiddleware
 
 # Configure structured logging
-from app.core.logging import setup_logging, metrics_collector
+from app.core.logging import setup_logging, stop_logging, metrics_collector
 logger = setup_logging(
     level=settings.LOG_LEVEL,
     json_format=True,  # Use JSON format for structured logging
@@ -53,7 +55,9 @@ async def lifespan(app: FastAPI):
     logger.info("🛑 Shutting down API service...")
     await background_worker.stop()
     worker_task.cancel()
+    await ml_client.close()
     await close_db()
+    stop_logging()
 
 
 # Create FastAPI app
@@ -62,15 +66,7 @@ app = FastAPI(
     description="REST API for AI-powered file deduplication",
     version="1.0.0",
     lifespan=lifespan,
-)
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    default_response_class=ORJSONResponse,
 )
 
 # Metrics middleware (should be early to capture all requests)
@@ -90,6 +86,17 @@ app.add_middleware(
     max_files=100,
 )
 
+# CORS middleware - added after the middleware above so it runs before them:
+# preflight OPTIONS requests are answered here without touching rate limiting
+# or metrics, and rejected responses from inner middleware still carry CORS headers
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=settings.CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
 # Security middleware (production only)
 if settings.NODE_ENV == "production":
     app.add_middleware(
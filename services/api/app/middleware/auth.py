@@ -2,7 +2,7 @@
 import logging
 from fastapi import Depends, HTTPException, Cookie, Header
 from typing import Optional
-from sqlalchemy import select
+from sqlalchemy import lambda_stmt, select
 from uuid import UUID
 
 from app.core.database import AsyncSessionLocal
@@ -66,7 +66,10 @@ async def get_current_user(
     
     # Get user from database
     async with AsyncSessionLocal() as session:
-        result = await session.execute(select(User).where(User.id == user_id))
+        # lambda_stmt caches the constructed statement; user_id is bound per call
+        result = await session.execute(
+            lambda_stmt(lambda: select(User).where(User.id == user_id))
+        )
         user = result.scalar_one_or_none()
     
     if not user:
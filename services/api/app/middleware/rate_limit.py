@@ -1,6 +1,7 @@
 """
 Rate limiting middleware for API endpoints
 """
+import bisect
 import time
 from typing import Dict, Optional
 from collections import defaultdict
@@ -10,15 +11,18 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Health probes are never rate limited
+RATE_LIMIT_EXEMPT_PATHS = frozenset({"/health", "/health/", "/health/ready"})
+
 
 class RateLimiter:
     """Simple in-memory rate limiter"""
     
     def __init__(self):
-        # Store request counts per user/IP
+        # Store sorted request timestamps (monotonic ns) per user/IP
         self.requests: Dict[str, list] = defaultdict(list)
-        self.cleanup_interval = 60  # Cleanup old entries every 60 seconds
-        self.last_cleanup = time.time()
+        self.cleanup_interval_ns = 60 * 1_000_000_000  # Cleanup old entries every 60 seconds
+        self.last_cleanup = time.monotonic_ns()
     
     def is_allowed(
         self, 
@@ -37,42 +41,37 @@ class RateLimiter:
         Returns:
             True if request is allowed, False otherwise
         """
-        now = time.time()
+        now = time.monotonic_ns()
+        window_start = now - window_seconds * 1_000_000_000
         
         # Cleanup old entries periodically
-        if now - self.last_cleanup > self.cleanup_interval:
-            self._cleanup(now, window_seconds)
+        if now - self.last_cleanup > self.cleanup_interval_ns:
+            self._cleanup(window_start)
             self.last_cleanup = now
         
-        # Get requests in current window
-        window_start = now - window_seconds
-        recent_requests = [
-            req_time for req_time in self.requests[key]
-            if req_time > window_start
-        ]
-        
-        # Update requests list
-        self.requests[key] = recent_requests
+        # Timestamps are appended in order, so expired ones form a prefix
+        request_times = self.requests[key]
+        expired = bisect.bisect_right(request_times, window_start)
+        if expired:
+            del request_times[:expired]
         
         # Check if limit exceeded
-        if len(recent_requests) >= max_requests:
+        if len(request_times) >= max_requests:
             return False
         
         # Add current request
-        self.requests[key].append(now)
+        request_times.append(now)
         return True
     
-    def _cleanup(self, now: float, window_seconds: int):
+    def _cleanup(self, window_start: int):
         """Remove old entries from memory"""
-        window_start = now - window_seconds
         keys_to_remove = []
         
-        for key, requests in self.requests.items():
-            self.requests[key] = [
-                req_time for req_time in requests
-                if req_time > window_start
-            ]
-            if not self.requests[key]:
+        for key, request_times in self.requests.items():
+            expired = bisect.bisect_right(request_times, window_start)
+            if expired:
+                del request_times[:expired]
+            if not request_times:
                 keys_to_remove.append(key)
         
         for key in keys_to_remove:
@@ -90,6 +89,14 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         super().__init__(app)
         self.default_max_requests = max_requests
         self.default_window_seconds = window_seconds
+        
+        # Settings are loaded once at startup, so resolve the limits up front
+        # (imported here so RateLimiter can be used without app settings)
+        from app.core.config import RATE_LIMIT_PROFILES, get_rate_limit_config
+        config = get_rate_limit_config("global")
+        self._profile_limits = (config["max_requests"], config["window_seconds"])
+        test_config = RATE_LIMIT_PROFILES["test_rate_limit"]["global"]
+        self._test_limits = (test_config["max_requests"], test_config["window_seconds"])
     
     def _get_rate_limit_config(self, request: Request) -> tuple[int, int]:
         """
@@ -109,22 +116,15 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             return (999999, 60)  # Effectively unlimited
         elif test_rate_limit == "enabled":
             # Use strict test_rate_limit profile
-            from app.core.config import get_rate_limit_config
-            config = get_rate_limit_config("global")
-            # Override to use test_rate_limit profile
-            import os
-            original_profile = os.environ.get("RATE_LIMIT_PROFILE", "production")
-            os.environ["RATE_LIMIT_PROFILE"] = "test_rate_limit"
-            config = get_rate_limit_config("global")
-            os.environ["RATE_LIMIT_PROFILE"] = original_profile
-            return (config["max_requests"], config["window_seconds"])
+            return self._test_limits
         else:
             # Use configured profile-based limits
-            from app.core.config import get_rate_limit_config
-            config = get_rate_limit_config("global")
-            return (config["max_requests"], config["window_seconds"])
+            return self._profile_limits
     
     async def dispatch(self, request: Request, call_next):
+        if request.url.path in RATE_LIMIT_EXEMPT_PATHS:
+            return await call_next(request)
+        
         # Get rate limit configuration
         max_requests, window_seconds = self._get_rate_limit_config(request)
         
@@ -5,7 +5,6 @@ import logging
 from typing import Any, Dict, List, Optional
 from fastapi import Request, HTTPException, status
 from starlette.middleware.base import BaseHTTPMiddleware
-import json
 
 logger = logging.getLogger(__name__)
 
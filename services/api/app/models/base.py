@@ -1,5 +1,11 @@
 """Base class for all SQLAlchemy models"""
+from datetime import datetime, timezone
 from sqlalchemy.orm import declarative_base
 
 # Base class for all models
 Base = declarative_base()
+
+
+def utcnow() -> datetime:
+    """Timezone-aware UTC timestamp for timestamptz column defaults"""
+    return datetime.now(timezone.utc)
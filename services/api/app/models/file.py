@@ -1,5 +1,4 @@
-from app.models.base import Base
-from datetime import datetime
+from app.models.base import Base, utcnow
 from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -17,7 +16,7 @@ class File(Base):
     sha256 = Column("sha256", String, nullable=False)
     phash = Column("phash", String)
     textExcerpt = Column("text_excerpt", String)
-    createdAt = Column("created_at", DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    createdAt = Column("created_at", DateTime(timezone=True), nullable=False, default=utcnow)
 
     # Relationships
     upload = relationship("Upload", back_populates="files", uselist=False)
@@ -1,5 +1,4 @@
-from app.models.base import Base
-from datetime import datetime
+from app.models.base import Base, utcnow
 from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -11,7 +10,7 @@ class LicenseKey(Base):
 
     key = Column("key", UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     userId = Column("user_id", UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    createdAt = Column("created_at", DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    createdAt = Column("created_at", DateTime(timezone=True), nullable=False, default=utcnow)
     revoked = Column("revoked", Boolean, nullable=False, default=False)
 
     # Relationships
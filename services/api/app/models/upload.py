@@ -1,5 +1,4 @@
-from app.models.base import Base
-from datetime import datetime
+from app.models.base import Base, utcnow
 from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -12,7 +11,7 @@ class Upload(Base):
     id = Column("id", UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     userId = Column("user_id", UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"))
     totalFiles = Column("total_files", Integer, nullable=False, default=0)
-    createdAt = Column("created_at", DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    createdAt = Column("created_at", DateTime(timezone=True), nullable=False, default=utcnow)
 
     # Relationships
     user = relationship("User", back_populates="uploads", uselist=False)
@@ -1,5 +1,4 @@
-from app.models.base import Base
-from datetime import datetime
+from app.models.base import Base, utcnow
 from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -13,8 +12,8 @@ class User(Base):
     email = Column("email", String, unique=True, nullable=False)
     name = Column("name", String)
     passwordHash = Column("password_hash", String, nullable=False)
-    createdAt = Column("created_at", DateTime(timezone=True), nullable=False, default=datetime.utcnow)
-    updatedAt = Column("updated_at", DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    createdAt = Column("created_at", DateTime(timezone=True), nullable=False, default=utcnow)
+    updatedAt = Column("updated_at", DateTime(timezone=True), nullable=False, default=utcnow, onupdate=utcnow)
 
     # Relationships
     licenseKeys = relationship("LicenseKey", back_populates="user")
@@ -4,16 +4,31 @@ Handles asynchronous file processing and duplicate detection
 """
 import asyncio
 import logging
+import os
 from pathlib import Path
 from typing import Dict, List, Any
 from datetime import datetime
 
+from app.core.config import settings
 from app.services.session_manager import session_manager
 from app.services.file_processor import file_processor
 from app.api.dedupe import _find_duplicate_groups
 
 logger = logging.getLogger(__name__)
 
+# MIME types by file extension for files saved to a session
+MIME_TYPES_BY_EXTENSION = {
+    '.txt': 'text/plain',
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.json': 'application/json',
+    '.ini': 'text/plain',
+}
+
 class BackgroundWorker:
     def __init__(self):
         self.is_running = False
@@ -90,42 +105,56 @@ class BackgroundWorker:
                 )
                 return
             
-            # Process files
-            processed_files = []
-            failed_count = 0
+            # Process files concurrently, bounded so large sessions don't
+            # read every file into memory at once
+            semaphore = asyncio.Semaphore(settings.PROCESSING_CONCURRENCY)
+            completed = 0
             
-            for i, file_path in enumerate(uploaded_files):
-                try:
-                    # Update progress
-                    progress = int((i / session.total_files) * 100)
+            async def process_with_limit(i: int, file_path: Path):
+                nonlocal completed
+                async with semaphore:
+                    failed = False
+                    try:
+                        # Process the file
+                        result = await self.process_single_file(file_path)
+                        logger.debug("Processed file %s in session %s", file_path.name, session_id)
+                    except Exception as e:
+                        logger.error(f"Failed to process file {file_path}: {e}")
+                        failed = True
+                        
+                        try:
+                            size_bytes = file_path.stat().st_size
+                        except OSError:
+                            size_bytes = 0
+                        
+                        # Add failed file to results
+                        result = {
+                            'id': f"file_{i}",
+                            'fileName': file_path.name,  # Frontend expects fileName
+                            'name': file_path.name,  # Keep for compatibility
+                            'sizeBytes': size_bytes,  # Frontend expects sizeBytes
+                            'size': size_bytes,  # Keep for compatibility
+                            'mimeType': 'application/octet-stream',  # Frontend expects mimeType
+                            'type': 'application/octet-stream',  # Keep for compatibility
+                            'success': False,
+                            'error': str(e)
+                        }
+                    
+                    # Update progress (100 is reserved for completion)
+                    completed += 1
                     await session_manager.update_session_progress(
                         session_id,
-                        progress=progress,
-                        processed_files=i
+                        progress=min(int((completed / session.total_files) * 100), 99),
+                        processed_files=completed
                     )
-                    
-                    # Process the file
-                    result = await self.process_single_file(file_path)
-                    processed_files.append(result)
-                    
-                    logger.info(f"Processed file {file_path.name} in session {session_id}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process file {file_path}: {e}")
-                    failed_count += 1
-                    
-                    # Add failed file to results
-                    processed_files.append({
-                        'id': f"file_{i}",
-                        'fileName': file_path.name,  # Frontend expects fileName
-                        'name': file_path.name,  # Keep for compatibility
-                        'sizeBytes': file_path.stat().st_size,  # Frontend expects sizeBytes
-                        'size': file_path.stat().st_size,  # Keep for compatibility
-                        'mimeType': 'application/octet-stream',  # Frontend expects mimeType
-                        'type': 'application/octet-stream',  # Keep for compatibility
-                        'success': False,
-                        'error': str(e)
-                    })
+                    return result, failed
+            
+            # gather preserves upload order in the results
+            outcomes = await asyncio.gather(
+                *(process_with_limit(i, file_path) for i, file_path in enumerate(uploaded_files))
+            )
+            processed_files = [result for result, _ in outcomes]
+            failed_count = sum(1 for _, failed in outcomes if failed)
             
             # Find duplicate groups
             logger.info(f"Finding duplicates for session {session_id}")
@@ -167,17 +196,18 @@ class BackgroundWorker:
     async def get_uploaded_files(self, session) -> List[Path]:
         """Get list of uploaded files in session directory"""
         files = []
-        for file_path in session.temp_dir.iterdir():
-            if file_path.is_file() and file_path.name != "results.json":
-                files.append(file_path)
+        # scandir's DirEntry reports the file type without an extra stat() per entry
+        with os.scandir(session.temp_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name != "results.json":
+                    files.append(Path(entry.path))
         return files
     
     async def process_single_file(self, file_path: Path) -> Dict[str, Any]:
         """Process a single file"""
         try:
-            # Read file content
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
+            # Read file content off the event loop
+            file_data = await asyncio.to_thread(file_path.read_bytes)
             
             # Determine MIME type
             mime_type = self.get_mime_type(file_path)
@@ -194,8 +224,8 @@ class BackgroundWorker:
                 'id': f"file_{file_path.name}",
                 'fileName': file_path.name,  # Frontend expects fileName
                 'name': file_path.name,  # Keep for compatibility
-                'sizeBytes': file_path.stat().st_size,  # Frontend expects sizeBytes
-                'size': file_path.stat().st_size,  # Keep for compatibility
+                'sizeBytes': len(file_data),  # Frontend expects sizeBytes
+                'size': len(file_data),  # Keep for compatibility
                 'mimeType': mime_type,  # Frontend expects mimeType
                 'type': mime_type,  # Keep for compatibility
                 'success': result.get('success', True),
@@ -211,19 +241,7 @@ class BackgroundWorker:
     
     def get_mime_type(self, file_path: Path) -> str:
         """Get MIME type based on file extension"""
-        extension = file_path.suffix.lower()
-        mime_types = {
-            '.txt': 'text/plain',
-            '.pdf': 'application/pdf',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp',
-            '.json': 'application/json',
-            '.ini': 'text/plain',
-        }
-        return mime_types.get(extension, 'application/octet-stream')
+        return MIME_TYPES_BY_EXTENSION.get(file_path.suffix.lower(), 'application/octet-stream')
     
     async def cleanup_old_sessions(self):
         """Periodically clean up old sessions"""
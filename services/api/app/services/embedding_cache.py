@@ -4,19 +4,86 @@ Avoids recomputing embeddings for files with the same content
 """
 import logging
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
-from sqlalchemy import select
+from typing import List, Dict, Any, Set, Tuple
+import numpy as np
+from cachetools import TTLCache
+from sqlalchemy import String, cast, literal, select, values
+from sqlalchemy import column as sql_column
 
 from app.services.ml_client import ml_client
 
 logger = logging.getLogger(__name__)
 
+# In-memory cache bounds (each embedding is a 512/768-float list)
+EMBEDDING_CACHE_MAXSIZE = 10_000
+EMBEDDING_CACHE_TTL_SECONDS = 3600
+
 # In-memory cache for embeddings (fallback if DB not available)
-_embedding_cache: Dict[str, Dict[str, List[float]]] = {
-    'text': {},
-    'image': {}
+_embedding_cache: Dict[str, TTLCache] = {
+    'text': TTLCache(maxsize=EMBEDDING_CACHE_MAXSIZE, ttl=EMBEDDING_CACHE_TTL_SECONDS),
+    'image': TTLCache(maxsize=EMBEDDING_CACHE_MAXSIZE, ttl=EMBEDDING_CACHE_TTL_SECONDS),
 }
 
+# Strong references to in-flight cache writes; the event loop only keeps weak
+# references to tasks, so an unreferenced write could be collected mid-flight
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _run_in_background(coro) -> None:
+    """Schedule a cache write that owns its own DB session"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _to_list(embedding) -> List[float]:
+    """pgvector returns numpy arrays; callers and the ML client expect plain lists"""
+    return embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    """Cosine similarity of two embedding vectors (0.0 if either is zero)"""
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    norms = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(a @ b / norms) if norms else 0.0
+
+
+def group_similar_embeddings(embeddings: List[List[float]], threshold: float) -> List[List[int]]:
+    """
+    Group embeddings whose cosine similarity to a group leader meets threshold
+    
+    All pairwise similarities come from a single matrix product of the
+    L2-normalized embeddings; each embedding not yet grouped then becomes a
+    leader and claims every other ungrouped embedding above threshold.
+    
+    Args:
+        embeddings: Equal-length embedding vectors
+        threshold: Minimum cosine similarity to the group leader
+        
+    Returns:
+        Groups of indices into embeddings, each with more than one member
+    """
+    if len(embeddings) < 2:
+        return []
+    
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    similarities = vectors @ vectors.T
+    ungrouped = np.ones(len(vectors), dtype=bool)
+    groups = []
+    
+    for i in range(len(vectors)):
+        if not ungrouped[i]:
+            continue
+        members = np.flatnonzero(ungrouped & (similarities[i] >= threshold))
+        ungrouped[members] = False
+        if len(members) > 1:
+            groups.append(members.tolist())
+    
+    return groups
+
 
 class EmbeddingCacheService:
     """Service for caching embeddings by SHA-256 hash"""
@@ -44,9 +111,11 @@ class EmbeddingCacheService:
         texts_to_generate = []
         indices_to_generate = []
         
-        # Check cache for each text
+        # Look up every hash in one batch, then check cache for each text
+        cached_embeddings = await self._get_cached_embeddings('text', sha256_hashes)
         for i, (text, sha256) in enumerate(zip(texts, sha256_hashes)):
-            cached_embedding = await self._get_cached_text_embedding(sha256)
+            # Files without a content hash have no stable cache key
+            cached_embedding = cached_embeddings.get(sha256) if sha256 else None
             if cached_embedding:
                 embeddings.append(cached_embedding)
                 cache_hits.append(True)
@@ -62,12 +131,17 @@ class EmbeddingCacheService:
             logger.info(f"Generating {len(texts_to_generate)} new text embeddings (cache miss)")
             new_embeddings = await ml_client.generate_text_embeddings(texts_to_generate)
             
-            # Store new embeddings in cache and fill in placeholders
+            # Fill in placeholders and collect new embeddings for caching
+            to_cache = {}
             for idx, (new_emb, sha256) in enumerate(zip(new_embeddings, [sha256_hashes[i] for i in indices_to_generate])):
                 original_idx = indices_to_generate[idx]
                 embeddings[original_idx] = new_emb
-                # Cache the embedding (async, don't wait)
-                asyncio.create_task(self._cache_text_embedding(sha256, new_emb))
+                if sha256:
+                    to_cache[sha256] = new_emb
+            
+            # Cache the whole batch in one transaction (async, don't wait)
+            if to_cache:
+                _run_in_background(self._cache_embeddings('text', to_cache))
         
         return embeddings, cache_hits
     
@@ -94,9 +168,11 @@ class EmbeddingCacheService:
         images_to_generate = []
         indices_to_generate = []
         
-        # Check cache for each image
+        # Look up every hash in one batch, then check cache for each image
+        cached_embeddings = await self._get_cached_embeddings('image', sha256_hashes)
         for i, (image, sha256) in enumerate(zip(images, sha256_hashes)):
-            cached_embedding = await self._get_cached_image_embedding(sha256)
+            # Files without a content hash have no stable cache key
+            cached_embedding = cached_embeddings.get(sha256) if sha256 else None
             if cached_embedding:
                 embeddings.append(cached_embedding)
                 cache_hits.append(True)
@@ -112,102 +188,85 @@ class EmbeddingCacheService:
             logger.info(f"Generating {len(images_to_generate)} new image embeddings (cache miss)")
             new_embeddings = await ml_client.generate_image_embeddings(images_to_generate)
             
-            # Store new embeddings in cache and fill in placeholders
+            # Fill in placeholders and collect new embeddings for caching
+            to_cache = {}
             for idx, (new_emb, sha256) in enumerate(zip(new_embeddings, [sha256_hashes[i] for i in indices_to_generate])):
                 original_idx = indices_to_generate[idx]
                 embeddings[original_idx] = new_emb
-                # Cache the embedding (async, don't wait)
-                asyncio.create_task(self._cache_image_embedding(sha256, new_emb))
+                if sha256:
+                    to_cache[sha256] = new_emb
+            
+            # Cache the whole batch in one transaction (async, don't wait)
+            if to_cache:
+                _run_in_background(self._cache_embeddings('image', to_cache))
         
         return embeddings, cache_hits
     
-    async def _get_cached_text_embedding(self, sha256: str) -> Optional[List[float]]:
-        """Get cached text embedding by SHA-256 hash"""
-        try:
-            # Check in-memory cache first
-            if sha256 in _embedding_cache['text']:
-                logger.debug(f"In-memory cache hit for text SHA-256: {sha256[:16]}...")
-                return _embedding_cache['text'][sha256]
-            
-            # Try to get from database if available
-            try:
-                from app.core.database import AsyncSessionLocal
-                from app.models.file import File
-                from app.models.file_embedding import FileEmbedding
-                
-                async with AsyncSessionLocal() as session:
-                    # Find file by SHA-256
-                    result = await session.execute(
-                        select(File).where(File.sha256 == sha256).limit(1)
-                    )
-                    file = result.scalar_one_or_none()
-                    
-                    if file:
-                        # Get embedding for this file
-                        emb_result = await session.execute(
-                            select(FileEmbedding).where(FileEmbedding.fileId == file.id)
-                        )
-                        embedding_record = emb_result.scalar_one_or_none()
-                        
-                        if embedding_record and embedding_record.embedding:
-                            # pgvector returns list directly
-                            embedding_list = embedding_record.embedding
-                            _embedding_cache['text'][sha256] = embedding_list
-                            return embedding_list
-            except Exception as db_error:
-                logger.debug(f"Database query failed (using in-memory cache only): {db_error}")
+    async def _get_cached_embeddings(self, kind: str, sha256_hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Get cached embeddings for a batch of SHA-256 hashes
+        
+        Args:
+            kind: 'text' or 'image'
+            sha256_hashes: SHA-256 hashes to look up (empty hashes are ignored)
             
-            return None
-        except Exception as e:
-            logger.warning(f"Error retrieving cached text embedding: {e}")
-            return None
-    
-    async def _get_cached_image_embedding(self, sha256: str) -> Optional[List[float]]:
-        """Get cached image embedding by SHA-256 hash"""
+        Returns:
+            Mapping of SHA-256 hash to embedding for every cache hit
+        """
+        found: Dict[str, List[float]] = {}
         try:
             # Check in-memory cache first
-            if sha256 in _embedding_cache['image']:
-                logger.debug(f"In-memory cache hit for image SHA-256: {sha256[:16]}...")
-                return _embedding_cache['image'][sha256]
+            memory_cache = _embedding_cache[kind]
+            missing: List[str] = []
+            for sha256 in set(filter(None, sha256_hashes)):
+                cached = memory_cache.get(sha256)
+                if cached is not None:
+                    found[sha256] = cached
+                else:
+                    missing.append(sha256)
+            
+            if not missing:
+                return found
             
-            # Try to get from database if available
+            # Try to get the rest from database if available
             try:
                 from app.core.database import AsyncSessionLocal
                 from app.models.file import File
                 from app.models.file_embedding import FileEmbedding
                 
+                column = FileEmbedding.embedding if kind == 'text' else FileEmbedding.embeddingImg
+                
                 async with AsyncSessionLocal() as session:
-                    # Find file by SHA-256
+                    # One embedding per SHA-256 for the whole batch in a single round trip
                     result = await session.execute(
-                        select(File).where(File.sha256 == sha256).limit(1)
+                        select(File.sha256, column)
+                        .join(File, FileEmbedding.fileId == File.id)
+                        .where(File.sha256.in_(missing))
+                        .where(column.isnot(None))
+                        .distinct(File.sha256)
                     )
-                    file = result.scalar_one_or_none()
-                    
-                    if file:
-                        # Get embedding for this file
-                        emb_result = await session.execute(
-                            select(FileEmbedding).where(FileEmbedding.fileId == file.id)
-                        )
-                        embedding_record = emb_result.scalar_one_or_none()
-                        
-                        if embedding_record and embedding_record.embeddingImg:
-                            # pgvector returns list directly
-                            embedding_list = embedding_record.embedding_img
-                            _embedding_cache['image'][sha256] = embedding_list
-                            return embedding_list
+                    for sha256, embedding in result.all():
+                        embedding_list = _to_list(embedding)
+                        memory_cache[sha256] = embedding_list
+                        found[sha256] = embedding_list
             except Exception as db_error:
                 logger.debug(f"Database query failed (using in-memory cache only): {db_error}")
-            
-            return None
         except Exception as e:
-            logger.warning(f"Error retrieving cached image embedding: {e}")
-            return None
+            logger.warning(f"Error retrieving cached {kind} embeddings: {e}")
+        
+        return found
     
-    async def _cache_text_embedding(self, sha256: str, embedding: List[float]):
-        """Cache text embedding by SHA-256 hash"""
+    async def _cache_embeddings(self, kind: str, embeddings: Dict[str, List[float]]):
+        """
+        Cache a batch of embeddings by SHA-256 hash
+        
+        Args:
+            kind: 'text' or 'image'
+            embeddings: Mapping of SHA-256 hash to embedding
+        """
         try:
             # Store in in-memory cache
-            _embedding_cache['text'][sha256] = embedding
+            _embedding_cache[kind].update(embeddings)
             
             # Try to store in database if available
             try:
@@ -216,72 +275,44 @@ class EmbeddingCacheService:
                 from app.models.file_embedding import FileEmbedding
                 from sqlalchemy.dialects.postgresql import insert
                 
-                async with AsyncSessionLocal() as session:
-                    # Find file by SHA-256
-                    result = await session.execute(
-                        select(File).where(File.sha256 == sha256).limit(1)
+                column = 'embedding' if kind == 'text' else 'embedding_img'
+                
+                table = FileEmbedding.__table__
+                vector_type = table.c[column].type
+                
+                # The batch as an inline VALUES list of (sha256, embedding)
+                batch = values(
+                    sql_column('sha256', String),
+                    sql_column('embedding', vector_type),
+                    name='batch'
+                ).data(list(embeddings.items()))
+                
+                # Resolve one file per SHA-256 inside the INSERT itself, so the
+                # whole batch is a single statement and round trip
+                source = (
+                    select(
+                        File.id,
+                        cast(literal(kind), table.c.kind.type),
+                        cast(batch.c.embedding, vector_type),
                     )
-                    file = result.scalar_one_or_none()
-                    
-                    if file:
-                        # Upsert embedding using SQLAlchemy
-                        stmt = insert(FileEmbedding).values(
-                            file_id=file.id,
-                            kind='text',
-                            embedding=embedding
-                        )
-                        stmt = stmt.on_conflict_do_update(
-                            index_elements=['file_id'],
-                            set_={'embedding': embedding}
-                        )
-                        await session.execute(stmt)
-                        await session.commit()
-                        logger.debug(f"Cached text embedding in DB for SHA-256: {sha256[:16]}...")
-            except Exception as db_error:
-                logger.debug(f"Database cache failed (using in-memory only): {db_error}")
-            
-        except Exception as e:
-            logger.warning(f"Error caching text embedding: {e}")
-    
-    async def _cache_image_embedding(self, sha256: str, embedding: List[float]):
-        """Cache image embedding by SHA-256 hash"""
-        try:
-            # Store in in-memory cache
-            _embedding_cache['image'][sha256] = embedding
-            
-            # Try to store in database if available
-            try:
-                from app.core.database import AsyncSessionLocal
-                from app.models.file import File
-                from app.models.file_embedding import FileEmbedding
-                from sqlalchemy.dialects.postgresql import insert
+                    .join(batch, File.sha256 == batch.c.sha256)
+                    .distinct(File.sha256)
+                )
+                stmt = insert(FileEmbedding).from_select(['file_id', 'kind', column], source)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['file_id'],
+                    set_={column: stmt.excluded[column]}
+                )
                 
                 async with AsyncSessionLocal() as session:
-                    # Find file by SHA-256
-                    result = await session.execute(
-                        select(File).where(File.sha256 == sha256).limit(1)
-                    )
-                    file = result.scalar_one_or_none()
-                    
-                    if file:
-                        # Upsert embedding using SQLAlchemy
-                        stmt = insert(FileEmbedding).values(
-                            file_id=file.id,
-                            kind='image',
-                            embedding_img=embedding
-                        )
-                        stmt = stmt.on_conflict_do_update(
-                            index_elements=['file_id'],
-                            set_={'embedding_img': embedding}
-                        )
-                        await session.execute(stmt)
-                        await session.commit()
-                        logger.debug(f"Cached image embedding in DB for SHA-256: {sha256[:16]}...")
+                    result = await session.execute(stmt)
+                    await session.commit()
+                    logger.debug(f"Cached {result.rowcount} {kind} embeddings in DB")
             except Exception as db_error:
                 logger.debug(f"Database cache failed (using in-memory only): {db_error}")
             
         except Exception as e:
-            logger.warning(f"Error caching image embedding: {e}")
+            logger.warning(f"Error caching {kind} embeddings: {e}")
 
 
 # Global instance
@@ -1,6 +1,7 @@
 """
 Unified file processing service
 """
+import asyncio
 import logging
 import hashlib
 from typing import Dict, Any, Optional
@@ -24,6 +25,13 @@ class FileProcessor:
         self.supported_pdf_types = {
             'application/pdf'
         }
+        
+        # MIME type -> processor, so dispatch is a single dict lookup
+        self._handlers = {
+            **dict.fromkeys(self.supported_pdf_types, self._process_pdf),
+            **dict.fromkeys(self.supported_image_types, self._process_image),
+            **dict.fromkeys(self.supported_text_types, self._process_text),
+        }
     
     async def process_file(self, file_data: bytes, filename: str, mime_type: str) -> Dict[str, Any]:
         """
@@ -37,26 +45,24 @@ class FileProcessor:
         Returns:
             Dictionary with processing results
         """
+        # Hash off the event loop; hashlib releases the GIL for large buffers,
+        # so concurrent uploads hash in parallel. Computed once so the error
+        # path below can reuse it
+        file_hash = await asyncio.to_thread(self._calculate_sha256, file_data)
+        
         try:
-            # Calculate file hash
-            file_hash = self._calculate_sha256(file_data)
-            
             # Determine file type and process accordingly
-            if mime_type in self.supported_pdf_types:
-                return await self._process_pdf(file_data, filename, mime_type, file_hash)
-            elif mime_type in self.supported_image_types:
-                return await self._process_image(file_data, filename, mime_type, file_hash)
-            elif mime_type in self.supported_text_types:
-                return await self._process_text(file_data, filename, mime_type, file_hash)
-            else:
+            handler = self._handlers.get(mime_type)
+            if handler is None:
                 return self._process_unsupported(filename, mime_type, file_hash)
+            return await handler(file_data, filename, mime_type, file_hash)
                 
         except Exception as e:
-            logger.error(f"File processing failed for {filename}: {e}", exc_info=True)
+            logger.exception("File processing failed for %s: %s", filename, e)
             return {
                 'success': False,
                 'error': str(e),
-                'file_hash': self._calculate_sha256(file_data),
+                'file_hash': file_hash,
                 'filename': filename,
                 'mime_type': mime_type
             }
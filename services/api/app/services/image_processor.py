@@ -1,10 +1,11 @@
 """
 Image processing and normalization service
 """
+import asyncio
 import logging
 import io
 import base64
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, List, Tuple
 from PIL import Image, ImageOps
 import numpy as np
 
@@ -18,6 +19,71 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Perceptual hashes are 64 bits, rendered as 16 hex characters
+PHASH_BITS = 64
+PHASH_HEX_LENGTH = PHASH_BITS // 4
+
+# Set-bit count for every byte value, used to popcount packed 64-bit hashes
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def hamming_distances(hashes: np.ndarray, target: np.uint64) -> np.ndarray:
+    """Hamming distance in bits from target to every hash in a uint64 array"""
+    xor = np.bitwise_xor(hashes, target)
+    return _POPCOUNT_TABLE[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def is_informative_hash(perceptual_hash: str, max_distance: int) -> bool:
+    """
+    Whether a perceptual hash carries enough detail to match on
+    
+    Flat or near-uniform images (solid colours, blank scans) hash to all or
+    almost all zero bits. Any two such hashes lie within max_distance of each
+    other whatever the images show, so they must not be grouped.
+    
+    Args:
+        perceptual_hash: 16-character hex perceptual hash
+        max_distance: Maximum Hamming distance (bits) used for grouping
+        
+    Returns:
+        True if the hash is more than max_distance bits from all-zero and all-one
+    """
+    set_bits = int(perceptual_hash, 16).bit_count()
+    return max_distance < set_bits < PHASH_BITS - max_distance
+
+
+def group_similar_hashes(perceptual_hashes: List[str], max_distance: int) -> List[List[int]]:
+    """
+    Group perceptual hashes within max_distance bits of each other
+    
+    Each hash not yet grouped becomes a group leader and claims every other
+    ungrouped hash within max_distance of it, so each step is one vectorized
+    XOR + popcount over all hashes rather than a pairwise Python loop.
+    
+    Args:
+        perceptual_hashes: 16-character hex perceptual hashes
+        max_distance: Maximum Hamming distance (bits) from the group leader
+        
+    Returns:
+        Groups of indices into perceptual_hashes, each with more than one member
+    """
+    if len(perceptual_hashes) < 2:
+        return []
+    
+    hashes = np.array([int(h, 16) for h in perceptual_hashes], dtype=np.uint64)
+    ungrouped = np.ones(len(hashes), dtype=bool)
+    groups = []
+    
+    for i in range(len(hashes)):
+        if not ungrouped[i]:
+            continue
+        members = np.flatnonzero(ungrouped & (hamming_distances(hashes, hashes[i]) <= max_distance))
+        ungrouped[members] = False
+        if len(members) > 1:
+            groups.append(members.tolist())
+    
+    return groups
+
 
 class ImageProcessor:
     """Service for processing and normalizing images"""
@@ -38,6 +104,12 @@ class ImageProcessor:
         Returns:
             Dictionary with processed image data and metadata
         """
+        # Decoding, resizing and re-encoding are CPU-bound; PIL releases the
+        # GIL for most of it, so run in a worker thread to keep the event loop free
+        return await asyncio.to_thread(self._process_image_sync, image_data, mime_type)
+    
+    def _process_image_sync(self, image_data: bytes, mime_type: str) -> Dict[str, Any]:
+        """Blocking implementation of process_image"""
         try:
             # Open image from bytes
             image = Image.open(io.BytesIO(image_data))
@@ -80,11 +152,11 @@ class ImageProcessor:
                 'error': None
             }
             
-            logger.info(f"Image processed successfully: {original_size} -> {normalized_image.size}")
+            logger.debug("Image processed successfully: %s -> %s", original_size, normalized_image.size)
             return result
             
         except Exception as e:
-            logger.error(f"Image processing failed: {e}", exc_info=True)
+            logger.exception("Image processing failed: %s", e)
             return {
                 'base64_image': '',
                 'perceptual_hash': '',
@@ -167,20 +239,10 @@ class ImageProcessor:
             # Convert to grayscale
             gray = resized.convert('L')
             
-            # Calculate average pixel value
-            pixels = list(gray.getdata())
-            avg = sum(pixels) / len(pixels)
-            
-            # Generate hash by comparing each pixel to average
-            hash_bits = []
-            for pixel in pixels:
-                hash_bits.append('1' if pixel > avg else '0')
-            
-            # Convert to hex
-            hash_string = ''.join(hash_bits)
-            hex_hash = hex(int(hash_string, 2))[2:].zfill(16)
-            
-            return hex_hash
+            # Compare each pixel to the average and pack the 64 bits, first
+            # pixel as the most significant, straight into 8 bytes
+            pixels = np.asarray(gray, dtype=np.uint8)
+            return np.packbits(pixels > pixels.mean()).tobytes().hex()
             
         except Exception as e:
             logger.error(f"Perceptual hash generation failed: {e}")
@@ -289,7 +351,7 @@ class ImageProcessor:
             return await self.process_image(image_data, mime_type)
             
         except Exception as e:
-            logger.error(f"Base64 image processing failed: {e}", exc_info=True)
+            logger.exception("Base64 image processing failed: %s", e)
             return {
                 'base64_image': '',
                 'perceptual_hash': '',
@@ -314,9 +376,9 @@ class ImageProcessor:
             return 0.0
         
         try:
-            # Calculate Hamming distance
-            distance = sum(c1 != c2 for c1, c2 in zip(hash1, hash2))
-            max_distance = len(hash1)
+            # Hamming distance in bits; XOR and popcount on the integer values
+            distance = (int(hash1, 16) ^ int(hash2, 16)).bit_count()
+            max_distance = len(hash1) * 4
             
             # Convert to similarity (0-1)
             similarity = 1.0 - (distance / max_distance)
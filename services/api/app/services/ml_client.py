@@ -1,11 +1,15 @@
 """ML Service Client"""
 import logging
 import httpx
-from typing import List
+from typing import List, Optional
 from app.core.config import settings
+from app.core.serializer import dumps, loads
 
 logger = logging.getLogger(__name__)
 
+# Request bodies are pre-encoded with orjson rather than httpx's stdlib json
+JSON_HEADERS = {"Content-Type": "application/json"}
+
 
 class MLServiceClient:
     """Client for ML inference service"""
@@ -13,6 +17,19 @@ class MLServiceClient:
     def __init__(self, base_url: str = None):
         self.base_url = base_url or settings.ML_SERVICE_URL
         self.timeout = settings.ML_SERVICE_TIMEOUT
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client on first use and reuse it afterwards"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        return self._client
+    
+    async def close(self):
+        """Close the pooled HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def generate_text_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Generate text embeddings"""
@@ -20,14 +37,14 @@ class MLServiceClient:
             return []
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/embeddings/text",
-                    json={"texts": texts}
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data["embeddings"]
+            response = await self._get_client().post(
+                "/embeddings/text",
+                content=dumps({"texts": texts}),
+                headers=JSON_HEADERS
+            )
+            response.raise_for_status()
+            data = loads(response.content)
+            return data["embeddings"]
                 
         except Exception as e:
             logger.error(f"ML service error: {e}")
@@ -39,14 +56,14 @@ class MLServiceClient:
             return []
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/embeddings/image",
-                    json={"images": images}
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data["embeddings"]
+            response = await self._get_client().post(
+                "/embeddings/image",
+                content=dumps({"images": images}),
+                headers=JSON_HEADERS
+            )
+            response.raise_for_status()
+            data = loads(response.content)
+            return data["embeddings"]
                 
         except Exception as e:
             logger.error(f"ML service error: {e}")
@@ -55,9 +72,8 @@ class MLServiceClient:
     async def health_check(self) -> bool:
         """Check if ML service is healthy"""
         try:
-            async with httpx.AsyncClient(timeout=5) as client:
-                response = await client.get(f"{self.base_url}/health")
-                return response.status_code == 200
+            response = await self._get_client().get("/health", timeout=5)
+            return response.status_code == 200
         except Exception:
             return False
 
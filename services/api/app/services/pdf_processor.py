@@ -1,6 +1,7 @@
 """
 PDF text extraction service
 """
+import asyncio
 import logging
 import io
 from typing import Optional, Dict, Any
@@ -28,6 +29,11 @@ class PDFProcessor:
         Returns:
             Dictionary with extracted text and metadata
         """
+        # Parsing is CPU-bound; run in a worker thread to keep the event loop free
+        return await asyncio.to_thread(self._extract_text_sync, pdf_data)
+    
+    def _extract_text_sync(self, pdf_data: bytes) -> Dict[str, Any]:
+        """Blocking implementation of extract_text"""
         try:
             # Create a file-like object from bytes
             pdf_buffer = io.BytesIO(pdf_data)
@@ -78,7 +84,7 @@ class PDFProcessor:
             return result
             
         except Exception as e:
-            logger.error(f"PDF processing failed: {e}", exc_info=True)
+            logger.exception("PDF processing failed: %s", e)
             return {
                 'text': '',
                 'metadata': {},
@@ -130,7 +136,7 @@ class PDFProcessor:
             return await self.extract_text(pdf_data)
             
         except Exception as e:
-            logger.error(f"Base64 PDF processing failed: {e}", exc_info=True)
+            logger.exception("Base64 PDF processing failed: %s", e)
             return {
                 'text': '',
                 'metadata': {},
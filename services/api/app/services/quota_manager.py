@@ -4,7 +4,6 @@ User quota management service
 import logging
 from typing import Optional
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
 from uuid import UUID
 
 from app.core.database import AsyncSessionLocal
@@ -15,6 +14,11 @@ from app.models.file import File
 logger = logging.getLogger(__name__)
 
 
+def _to_uuid(user_id) -> UUID:
+    """Accept a user ID as a UUID (ORM models) or its string form"""
+    return user_id if isinstance(user_id, UUID) else UUID(str(user_id))
+
+
 class QuotaManager:
     """Manage user storage and upload quotas"""
     
@@ -30,26 +34,21 @@ class QuotaManager:
             True if user has enough quota, False otherwise
         """
         try:
-            # Convert string ID to UUID
+            # Normalize user ID to UUID
             try:
-                user_uuid = UUID(user_id)
-            except (ValueError, AttributeError):
+                user_uuid = _to_uuid(user_id)
+            except (ValueError, TypeError):
                 logger.error(f"Invalid user ID format: {user_id}")
                 return False
             
             async with AsyncSessionLocal() as session:
-                # Get user's total file size
+                # Sum user's total file size in SQL
                 result = await session.execute(
-                    select(Upload)
+                    select(func.coalesce(func.sum(File.sizeBytes), 0))
+                    .join(Upload, File.uploadId == Upload.id)
                     .where(Upload.userId == user_uuid)
-                    .options(selectinload(Upload.files))
                 )
-                user_uploads = result.scalars().all()
-                
-                total_size = 0
-                for upload in user_uploads:
-                    for file in upload.files:
-                        total_size += file.sizeBytes or 0
+                total_size = result.scalar() or 0
                 
                 # Check if adding new data would exceed quota
                 max_bytes = settings.MAX_STORAGE_PER_USER_MB * 1024 * 1024
@@ -75,22 +74,31 @@ class QuotaManager:
             True if user can upload more, False otherwise
         """
         try:
-            # Convert string ID to UUID
+            # Normalize user ID to UUID
             try:
-                user_uuid = UUID(user_id)
-            except (ValueError, AttributeError):
+                user_uuid = _to_uuid(user_id)
+            except (ValueError, TypeError):
                 logger.error(f"Invalid user ID format: {user_id}")
                 return False
             
+            # A limit of zero blocks every upload; the probe below needs a
+            # non-negative offset
+            if settings.MAX_UPLOADS_PER_USER <= 0:
+                logger.warning(f"User {user_id} reached upload limit: {settings.MAX_UPLOADS_PER_USER}")
+                return False
+            
             async with AsyncSessionLocal() as session:
-                # Count user's uploads
+                # Probe for the upload at the limit rather than counting them
+                # all; this reads at most MAX_UPLOADS_PER_USER index entries
                 result = await session.execute(
-                    select(func.count()).select_from(Upload).where(Upload.userId == user_uuid)
+                    select(Upload.id)
+                    .where(Upload.userId == user_uuid)
+                    .offset(settings.MAX_UPLOADS_PER_USER - 1)
+                    .limit(1)
                 )
-                upload_count = result.scalar() or 0
                 
-                if upload_count >= settings.MAX_UPLOADS_PER_USER:
-                    logger.warning(f"User {user_id} reached upload limit: {upload_count}")
+                if result.first() is not None:
+                    logger.warning(f"User {user_id} reached upload limit: {settings.MAX_UPLOADS_PER_USER}")
                     return False
                 
                 return True
@@ -111,28 +119,33 @@ class QuotaManager:
             Dictionary with quota information
         """
         try:
-            # Convert string ID to UUID
+            # Normalize user ID to UUID
             try:
-                user_uuid = UUID(user_id)
-            except (ValueError, AttributeError):
+                user_uuid = _to_uuid(user_id)
+            except (ValueError, TypeError):
                 logger.error(f"Invalid user ID format: {user_id}")
                 return self._get_empty_quota_info()
             
             async with AsyncSessionLocal() as session:
-                # Get user's uploads and files
+                # Count user's uploads and aggregate their files in one query
+                uploads_count_subquery = (
+                    select(func.count())
+                    .select_from(Upload)
+                    .where(Upload.userId == user_uuid)
+                    .correlate(None)
+                    .scalar_subquery()
+                )
                 result = await session.execute(
-                    select(Upload)
+                    select(
+                        uploads_count_subquery,
+                        func.coalesce(func.sum(File.sizeBytes), 0),
+                        func.count(File.id),
+                    )
+                    .select_from(File)
+                    .join(Upload, File.uploadId == Upload.id)
                     .where(Upload.userId == user_uuid)
-                    .options(selectinload(Upload.files))
                 )
-                user_uploads = result.scalars().all()
-                
-                total_size = 0
-                total_files = 0
-                for upload in user_uploads:
-                    for file in upload.files:
-                        total_size += file.sizeBytes or 0
-                        total_files += 1
+                uploads_count, total_size, total_files = result.one()
                 
                 max_storage_bytes = settings.MAX_STORAGE_PER_USER_MB * 1024 * 1024
                 max_uploads = settings.MAX_UPLOADS_PER_USER
@@ -143,7 +156,7 @@ class QuotaManager:
                     'storage_used_mb': round(total_size / (1024 * 1024), 2),
                     'storage_limit_mb': settings.MAX_STORAGE_PER_USER_MB,
                     'storage_percentage': round((total_size / max_storage_bytes) * 100, 2) if max_storage_bytes > 0 else 0,
-                    'uploads_count': len(user_uploads),
+                    'uploads_count': uploads_count,
                     'uploads_limit': max_uploads,
                     'files_count': total_files,
                 }
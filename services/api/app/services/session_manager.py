@@ -3,7 +3,8 @@ Session Manager for File Upload Processing
 Handles upload sessions, progress tracking, and result storage
 """
 import os
-import json
+import time
+import shutil
 import uuid
 import asyncio
 from datetime import datetime, timedelta
@@ -11,9 +12,24 @@ from typing import Dict, List, Optional, Any
 from pathlib import Path
 import logging
 
+import aiofiles
+
+from app.core.serializer import dumps, loads
+
 logger = logging.getLogger(__name__)
 
+# Progress-only updates are persisted at most this often; status changes,
+# results and errors are always written immediately
+PROGRESS_SAVE_INTERVAL_SECONDS = 0.1
+PROGRESS_FIELDS = frozenset({"progress", "processed_files"})
+
 class UploadSession:
+    __slots__ = (
+        "session_id", "user_id", "created_at", "status", "progress",
+        "total_files", "processed_files", "failed_files", "duplicate_groups",
+        "processing_stats", "error_message", "temp_dir", "results_file", "save_lock", "last_saved_at",
+    )
+    
     def __init__(self, session_id: str, user_id: str):
         self.session_id = session_id
         self.user_id = user_id
@@ -29,12 +45,16 @@ class UploadSession:
         # temp_dir will be set to absolute path in create_session
         self.temp_dir = Path(f"temp_files/{session_id}")
         self.results_file = self.temp_dir / "results.json"
+        # Serializes state file writes from concurrent progress updates
+        self.save_lock = asyncio.Lock()
+        self.last_saved_at = 0.0  # time.monotonic() of the last state write
         
     def to_dict(self) -> Dict[str, Any]:
+        # created_at and user_id stay native; the serializer encodes datetimes and UUIDs itself
         return {
             "session_id": self.session_id,
             "user_id": self.user_id,
-            "created_at": self.created_at.isoformat(),
+            "created_at": self.created_at,
             "status": self.status,
             "progress": self.progress,
             "total_files": self.total_files,
@@ -84,6 +104,12 @@ class SessionManager:
         for key, value in kwargs.items():
             if hasattr(session, key):
                 setattr(session, key, value)
+        
+        # The in-memory session is always current; throttle progress-only writes
+        now = time.monotonic()
+        if kwargs.keys() <= PROGRESS_FIELDS and now - session.last_saved_at < PROGRESS_SAVE_INTERVAL_SECONDS:
+            return
+        session.last_saved_at = now
                 
         # Save progress to file for persistence
         await self.save_session_state(session)
@@ -91,8 +117,9 @@ class SessionManager:
     async def save_session_state(self, session: UploadSession):
         """Save session state to file"""
         try:
-            with open(session.results_file, 'w') as f:
-                json.dump(session.to_dict(), f, indent=2)
+            async with session.save_lock:
+                async with aiofiles.open(session.results_file, 'wb') as f:
+                    await f.write(dumps(session.to_dict()))
         except Exception as e:
             logger.error(f"Failed to save session state: {e}")
     
@@ -100,26 +127,35 @@ class SessionManager:
         """Load session state from file"""
         try:
             results_file = self.temp_base_dir / session_id / "results.json"
-            if results_file.exists():
-                with open(results_file, 'r') as f:
-                    data = json.load(f)
-                
-                session = UploadSession(session_id, data["user_id"])
-                session.created_at = datetime.fromisoformat(data["created_at"])
-                session.status = data["status"]
-                session.progress = data["progress"]
-                session.total_files = data["total_files"]
-                session.processed_files = data["processed_files"]
-                session.failed_files = data["failed_files"]
-                session.duplicate_groups = data["duplicate_groups"]
-                session.processing_stats = data["processing_stats"]
-                session.error_message = data["error_message"]
-                
-                # Set temp_dir to absolute path
-                session.temp_dir = self.temp_base_dir / session_id
-                session.results_file = session.temp_dir / "results.json"
-                
-                return session
+            try:
+                async with aiofiles.open(results_file, 'rb') as f:
+                    data = loads(await f.read())
+            except FileNotFoundError:
+                return None
+            
+            # user IDs are UUIDs in memory but strings once written to disk
+            user_id = data["user_id"]
+            try:
+                user_id = uuid.UUID(user_id)
+            except (ValueError, TypeError, AttributeError):
+                pass
+            
+            session = UploadSession(session_id, user_id)
+            session.created_at = datetime.fromisoformat(data["created_at"])
+            session.status = data["status"]
+            session.progress = data["progress"]
+            session.total_files = data["total_files"]
+            session.processed_files = data["processed_files"]
+            session.failed_files = data["failed_files"]
+            session.duplicate_groups = data["duplicate_groups"]
+            session.processing_stats = data["processing_stats"]
+            session.error_message = data["error_message"]
+            
+            # Set temp_dir to absolute path
+            session.temp_dir = self.temp_base_dir / session_id
+            session.results_file = session.temp_dir / "results.json"
+            
+            return session
         except Exception as e:
             logger.error(f"Failed to load session state: {e}")
         
@@ -134,15 +170,21 @@ class SessionManager:
             if session.created_at < cutoff_time:
                 sessions_to_remove.append(session_id)
         
-        for session_id in sessions_to_remove:
-            await self.cleanup_session(session_id)
+        # Remove expired sessions concurrently; one failure shouldn't stop the rest
+        results = await asyncio.gather(
+            *(self.cleanup_session(session_id) for session_id in sessions_to_remove),
+            return_exceptions=True
+        )
+        for session_id, result in zip(sessions_to_remove, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to clean up session {session_id}: {result}")
     
     async def cleanup_session(self, session_id: str):
         """Clean up session and its temp files"""
         session = self.sessions.get(session_id)
         if session and session.temp_dir.exists():
-            import shutil
-            shutil.rmtree(session.temp_dir)
+            # Deleting a directory tree is blocking I/O; keep it off the event loop
+            await asyncio.to_thread(shutil.rmtree, session.temp_dir)
             
         if session_id in self.sessions:
             del self.sessions[session_id]
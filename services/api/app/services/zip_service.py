@@ -3,6 +3,7 @@ ZIP file creation service for downloading cleaned files
 """
 import logging
 import os
+import re
 import tempfile
 import zipfile
 from typing import List, Dict, Any, BinaryIO, Optional
@@ -10,10 +11,13 @@ from pathlib import Path
 import asyncio
 from fastapi.responses import StreamingResponse
 import io
-import json
 
 logger = logging.getLogger(__name__)
 
+# Any character outside [A-Za-z0-9._-] is replaced in ZIP entry names
+UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+KNOWN_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.txt', '.doc', '.docx')
+
 class ZipService:
     """Service for creating ZIP files from selected files"""
     
@@ -88,7 +92,7 @@ class ZipService:
             return zip_path
             
         except Exception as e:
-            logger.error(f"ZIP creation failed: {e}", exc_info=True)
+            logger.exception("ZIP creation failed: %s", e)
             self._cleanup()
             raise
     
@@ -150,17 +154,19 @@ class ZipService:
     def cleanup_zip(self, zip_path: str):
         """Clean up ZIP file after streaming"""
         try:
-            if os.path.exists(zip_path):
+            try:
                 os.unlink(zip_path)
                 logger.info(f"Cleaned up ZIP file: {zip_path}")
+            except FileNotFoundError:
+                pass  # Already removed
             
             # Also cleanup temp directory if it's empty
             zip_dir = os.path.dirname(zip_path)
-            if zip_dir and os.path.exists(zip_dir):
+            if zip_dir:
                 try:
                     os.rmdir(zip_dir)
                 except OSError:
-                    pass  # Directory not empty, ignore
+                    pass  # Directory missing or not empty, ignore
         except Exception as e:
             logger.warning(f"Failed to cleanup ZIP file {zip_path}: {e}")
     
@@ -183,20 +189,19 @@ class ZipService:
             # Create ZIP file
             with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                 for file_path in file_paths:
-                    if os.path.exists(file_path):
-                        try:
-                            # Get relative path for ZIP
-                            arcname = os.path.basename(file_path)
-                            zipf.write(file_path, arcname)
-                            self.created_files.append(arcname)
-                            
-                            logger.info(f"Added {arcname} to ZIP")
-                            
-                        except Exception as e:
-                            logger.error(f"Failed to add {file_path} to ZIP: {e}")
-                            continue
-                    else:
+                    try:
+                        # Get relative path for ZIP
+                        arcname = os.path.basename(file_path)
+                        zipf.write(file_path, arcname)
+                        self.created_files.append(arcname)
+                        
+                        logger.info(f"Added {arcname} to ZIP")
+                        
+                    except FileNotFoundError:
                         logger.warning(f"File not found: {file_path}")
+                    except Exception as e:
+                        logger.error(f"Failed to add {file_path} to ZIP: {e}")
+                        continue
             
             return zip_path
             
@@ -216,15 +221,14 @@ class ZipService:
             Safe filename
         """
         # Remove or replace unsafe characters
-        safe_chars = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_."
-        safe_filename = "".join(c if c in safe_chars else "_" for c in filename)
+        safe_filename = UNSAFE_FILENAME_CHARS.sub("_", filename)
         
         # Ensure it's not empty
         if not safe_filename:
             safe_filename = "file"
         
         # Add extension if missing
-        if not safe_filename.endswith(('.pdf', '.jpg', '.jpeg', '.png', '.txt', '.doc', '.docx')):
+        if not safe_filename.endswith(KNOWN_EXTENSIONS):
             safe_filename += ".file"
         
         return safe_filename
@@ -232,10 +236,12 @@ class ZipService:
     def _cleanup(self):
         """Clean up temporary files and directories"""
         try:
-            if self.temp_dir and os.path.exists(self.temp_dir):
+            if self.temp_dir:
                 import shutil
                 shutil.rmtree(self.temp_dir)
                 logger.info("Cleaned up temporary directory")
+        except FileNotFoundError:
+            pass  # Already removed
         except Exception as e:
             logger.warning(f"Failed to cleanup temporary directory: {e}")
         finally:
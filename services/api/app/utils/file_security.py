@@ -25,6 +25,9 @@ ALLOWED_EXTENSIONS = {
     'text': {'.txt', '.csv', '.log', '.md'}
 }
 
+# Flattened once for O(1) membership checks
+ALL_ALLOWED_EXTENSIONS = frozenset().union(*ALLOWED_EXTENSIONS.values())
+
 # MIME type to extension mapping for validation
 MIME_TYPE_MAP = {
     'image/jpeg': '.jpg',
@@ -132,12 +135,7 @@ def validate_file_extension(filename: str) -> bool:
         True if extension is allowed
     """
     ext = os.path.splitext(filename)[1].lower()
-    
-    for category, extensions in ALLOWED_EXTENSIONS.items():
-        if ext in extensions:
-            return True
-    
-    return False
+    return ext in ALL_ALLOWED_EXTENSIONS
 
 
 def validate_mime_type(file_data: bytes, declared_mime: str) -> tuple[bool, str]:
@@ -65,3 +65,135 @@ async def test_file_validation():
     assert result["valid"] is False
     assert len(result["errors"]) > 0
 
+
+def test_group_similar_hashes():
+    """Test perceptual hash grouping by Hamming distance"""
+    from app.services.image_processor import group_similar_hashes
+    
+    hashes = [
+        "ffffffffffffffff",
+        "fffffffffffffff0",  # 4 bits from the first
+        "0000000000000000",
+        "000000000000000f",  # 4 bits from the third
+        "00000000ffffffff",  # 32 bits from everything else
+    ]
+    assert group_similar_hashes(hashes, max_distance=6) == [[0, 1], [2, 3]]
+    assert group_similar_hashes(hashes, max_distance=3) == []
+    assert group_similar_hashes(hashes[:1], max_distance=6) == []
+
+
+def test_group_similar_embeddings():
+    """Test text embedding grouping by cosine similarity"""
+    from app.services.embedding_cache import group_similar_embeddings
+    
+    embeddings = [
+        [1.0, 0.0, 0.0],
+        [0.0, 1.0, 0.0],
+        [2.0, 0.1, 0.0],  # Same direction as the first
+        [0.0, 0.0, 1.0],
+    ]
+    assert group_similar_embeddings(embeddings, threshold=0.9) == [[0, 2]]
+    assert group_similar_embeddings(embeddings, threshold=0.9999) == []
+    assert group_similar_embeddings(embeddings[:1], threshold=0.9) == []
+
+
+def test_perceptual_hash_bit_order():
+    """Test that the first pixel maps to the most significant hash bit"""
+    from PIL import Image
+    from app.services.image_processor import image_processor
+    
+    image = Image.new("RGB", (64, 64), "black")
+    image.paste((255, 255, 255), (0, 0, 64, 32))  # Top half white
+    assert image_processor._generate_perceptual_hash(image) == "ffffffff00000000"
+
+
+def test_calculate_image_similarity():
+    """Test perceptual hash similarity counts differing bits"""
+    from app.services.image_processor import image_processor
+    
+    assert image_processor.calculate_image_similarity("ffffffffffffffff", "ffffffffffffffff") == 1.0
+    # One hex digit apart by a single bit is 63/64 similar, not 15/16
+    assert image_processor.calculate_image_similarity("ffffffffffffffff", "fffffffffffffffe") == 63 / 64
+    assert image_processor.calculate_image_similarity("ffffffffffffffff", "0000000000000000") == 0.0
+    assert image_processor.calculate_image_similarity("", "ffffffffffffffff") == 0.0
+
+
+async def _image_file(file_id: str, image) -> dict:
+    """Build a processed-file dict for an in-memory PIL image"""
+    import hashlib
+    import io
+    from app.services.image_processor import image_processor
+    
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    data = buffer.getvalue()
+    result = await image_processor.process_image(data, "image/png")
+    return {
+        'id': file_id,
+        'fileName': f"{file_id}.png",
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'size': len(data),
+        'success': True,
+        'perceptual_hash': result['perceptual_hash'],
+    }
+
+
+@pytest.mark.asyncio
+async def test_find_duplicate_groups_ignores_flat_images():
+    """Test that solid-colour images are not grouped as visually similar"""
+    from PIL import Image
+    from app.api.dedupe import _find_duplicate_groups
+    
+    files = [
+        await _image_file(color, Image.new("RGB", (64, 64), color))
+        for color in ("white", "black", "red", "blue")
+    ]
+    assert await _find_duplicate_groups(files, [], []) == []
+
+
+@pytest.mark.asyncio
+async def test_find_duplicate_groups_groups_similar_images():
+    """Test that near-identical images are grouped by perceptual hash"""
+    from PIL import Image
+    from app.api.dedupe import _find_duplicate_groups
+    
+    original = Image.new("RGB", (64, 64), "black")
+    original.paste((255, 255, 255), (0, 0, 32, 64))  # Left half white
+    edited = original.copy()
+    edited.putpixel((63, 63), (40, 40, 40))
+    
+    files = [await _image_file("original", original), await _image_file("edited", edited)]
+    groups = await _find_duplicate_groups(files, [], [])
+    
+    assert len(groups) == 1
+    assert groups[0]['reason'] == 'Visually similar images'
+    assert len(groups[0]['duplicates']) == 1
+
+
+@pytest.mark.asyncio
+async def test_find_duplicate_groups_similar_text_uses_kept_file():
+    """Test that near-duplicate text is matched against each exact-text keeper"""
+    from app.api.dedupe import _find_duplicate_groups
+    
+    def text_file(file_id: str, text: str, size: int) -> dict:
+        return {
+            'id': file_id,
+            'fileName': file_id,
+            'sha256': file_id * 8,
+            'size': size,
+            'success': True,
+            'text_content': text,
+        }
+    
+    files = [
+        text_file("a.txt", "quarterly report", 100),
+        text_file("b.pdf", "quarterly report", 300),  # Same text, kept as larger
+        text_file("c.txt", "quarterly report.", 200),
+    ]
+    text_embeddings = [[1.0, 0.0], [1.0, 0.0], [0.99, 0.1]]
+    groups = await _find_duplicate_groups(files, text_embeddings, [])
+    
+    kept = {g['keepFile']['id'] for g in groups}
+    removed = {d['file']['id'] for g in groups for d in g['duplicates']}
+    assert kept == {"b.pdf"}
+    assert removed == {"a.txt", "c.txt"}
@@ -173,6 +173,54 @@ class TestDeduplicationWorkflow:
         # assert preview_response.status_code == 200
 
 
+class TestSessionUploadWorkflow:
+    """Test uploads to background processing sessions"""
+    
+    @pytest.fixture
+    def authenticated_client(self):
+        """Create authenticated client"""
+        register_data = {
+            "email": "session_test@example.com",
+            "password": "TestPass123",
+            "name": "Session Test User"
+        }
+        
+        client.post("/auth/register", json=register_data)
+        login_response = client.post("/auth/login", json={
+            "email": register_data["email"],
+            "password": register_data["password"]
+        })
+        
+        token = login_response.json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+    
+    def test_same_named_uploads_are_both_saved(self, authenticated_client):
+        """Test that uploads sharing a filename don't overwrite each other"""
+        from app.services.session_manager import session_manager
+        
+        first = b"a" * (3 * 1024 * 1024)
+        second = b"b" * (2 * 1024 * 1024)
+        files = [
+            ("files", ("IMG_0001.txt", io.BytesIO(first), "text/plain")),
+            ("files", ("IMG_0001.txt", io.BytesIO(second), "text/plain")),
+        ]
+        
+        upload_response = client.post(
+            "/uploads/upload",
+            files=files,
+            headers=authenticated_client
+        )
+        
+        assert upload_response.status_code == 200
+        session = session_manager.sessions[upload_response.json()["session_id"]]
+        saved = {
+            path.name: path.read_bytes()
+            for path in session.temp_dir.iterdir()
+            if path.name != "results.json"
+        }
+        assert saved == {"IMG_0001.txt": first, "IMG_0001 (1).txt": second}
+
+
 class TestRateLimiting:
     """Test rate limiting functionality"""
     
@@ -0,0 +1,15 @@
+"""
+Tests for quota management
+"""
+import uuid
+import pytest
+from app.core.config import settings
+from app.services.quota_manager import quota_manager
+
+
+@pytest.mark.asyncio
+async def test_upload_count_zero_limit_blocks_uploads(monkeypatch):
+    """Test that a zero upload limit blocks users with no uploads"""
+    monkeypatch.setattr(settings, "MAX_UPLOADS_PER_USER", 0)
+    
+    assert await quota_manager.check_user_upload_count(str(uuid.uuid4())) is False
@@ -16,11 +16,11 @@ router = APIRouter()
 
 # Request/Response models
 class TextEmbeddingRequest(BaseModel):
-    texts: List[str] = Field(..., min_items=1, max_items=settings.MAX_BATCH_SIZE)
+    texts: List[str] = Field(..., min_length=1, max_length=settings.MAX_BATCH_SIZE)
 
 
 class ImageEmbeddingRequest(BaseModel):
-    images: List[str] = Field(..., min_items=1, max_items=settings.MAX_BATCH_SIZE)
+    images: List[str] = Field(..., min_length=1, max_length=settings.MAX_BATCH_SIZE)
     # images should be base64 encoded strings
 
 
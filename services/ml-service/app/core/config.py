@@ -3,7 +3,7 @@ Configuration settings for ML service
 """
 import os
 from typing import List
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -29,10 +29,11 @@ class Settings(BaseSettings):
     # Memory
     MAX_MEMORY_MB: int = 2048
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
-        extra = "ignore"  # Ignore extra fields from .env that aren't in Settings
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=True,
+        extra="ignore",  # Ignore extra fields from .env that aren't in Settings
+    )
 
 
 settings = Settings()
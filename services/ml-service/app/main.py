@@ -4,6 +4,7 @@ Main FastAPI application for ML inference
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
@@ -43,6 +44,7 @@ app = FastAPI(
     description="Machine Learning inference service for file deduplication",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware